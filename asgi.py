@@ -0,0 +1,337 @@
+"""ASGI 비동기 서버 진입점
+
+main.py의 Flask 앱과 같은 경로(/, /search, /exit, /static)를 제공하되,
+문화공공데이터 API는 httpx.AsyncClient로, AI 분석은 AsyncOpenAI로 호출하여
+한 프로세스에서 많은 검색 요청을 동시에 처리할 수 있습니다.
+검색 캐시, 서킷 브레이커, 응답 해석, AI 분석 캐시는 main.py의 것을 그대로 사용합니다.
+
+실행 방법:
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+    gunicorn asgi:app -k uvicorn.workers.UvicornWorker
+"""
+import asyncio
+import json
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
+from starlette.routing import Mount, Route
+from starlette.staticfiles import StaticFiles
+
+import main
+from main import (
+    RETRY_STATUS_CODES, analysis_cache, api, format_bookstore_info, get_search_suggestion,
+    get_test_mode_response, logger, stage_timer
+)
+
+def create_async_openai_client():
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+# AsyncOpenAI 클라이언트 (main.py와 마찬가지로 처음 사용할 때 만들고, 실패해도 앱은 동작합니다)
+async_openai_client = main.LazyClient("AsyncOpenAI", create_async_openai_client)
+if not main.LAZY_INIT:
+    async_openai_client.get()
+
+@asynccontextmanager
+async def concurrency_slot(semaphore, wait_timeout):
+    """main.ConcurrencyLimiter.slot의 비동기 버전: 자리를 얻으면 True, 시간 안에 못 얻으면 False를 넘깁니다."""
+    try:
+        await asyncio.wait_for(semaphore.acquire(), wait_timeout)
+    except asyncio.TimeoutError:
+        yield False
+        return
+    try:
+        yield True
+    finally:
+        semaphore.release()
+
+# 동시 AI 분석 호출 수 제한 (main.ai_limiter와 같은 설정)
+ai_slots = asyncio.Semaphore(main.ai_limiter.limit)
+
+class AsyncBookstoreClient:
+    """BookstoreAPI의 캐시와 서킷 브레이커를 공유하면서 API를 비동기로 호출하는 클라이언트"""
+
+    def __init__(self, api):
+        self.api = api
+        self.http = None
+        self._in_flight = {}
+        self._background_tasks = set()
+        self.upstream_slots = asyncio.Semaphore(api.upstream_limiter.limit)
+
+    async def start(self):
+        self.http = httpx.AsyncClient(
+            timeout=10,
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("UPSTREAM_POOL_SIZE", 10)) * 10,
+                max_keepalive_connections=int(os.getenv("UPSTREAM_POOL_SIZE", 10))
+            )
+        )
+
+    async def close(self):
+        if self.http is not None:
+            await self.http.aclose()
+
+    async def search_bookstores(self, keyword=None, page_no=1, num_of_rows=10):
+        """BookstoreAPI.search_bookstores의 비동기 버전입니다."""
+        if keyword and self.api.catalog is not None:
+            return self.api.catalog.search(keyword, page_no, num_of_rows)
+
+        cache = self.api.cache
+        cache_key = self.api.cache_key(keyword, page_no, num_of_rows)
+        value, state = cache.lookup(cache_key)
+        if state == "fresh":
+            return value
+        if state == "stale":
+            if cache.claim_refresh(cache_key):
+                self._run_in_background(self._refresh(cache_key, keyword, page_no, num_of_rows))
+            return value
+
+        result = cache.store(cache_key, await self._fetch_once(cache_key, keyword, page_no, num_of_rows))
+        return self.api.fallback_to_cache(cache_key, result)
+
+    def _run_in_background(self, coroutine):
+        # 실행 중인 태스크가 가비지 컬렉션되지 않도록 참조를 보관합니다.
+        task = asyncio.ensure_future(coroutine)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _refresh(self, cache_key, keyword, page_no, num_of_rows):
+        refreshed = False
+        try:
+            self.api.cache.store(cache_key, await self._fetch_once(cache_key, keyword, page_no, num_of_rows))
+            refreshed = True
+        finally:
+            self.api.cache.release_refresh(cache_key, refreshed)
+
+    async def _fetch_once(self, cache_key, keyword, page_no, num_of_rows):
+        """같은 키로 동시에 들어온 요청은 진행 중인 호출 하나를 함께 기다립니다."""
+        task = self._in_flight.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_bookstores(keyword, page_no, num_of_rows))
+            self._in_flight[cache_key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(cache_key, None))
+        return await asyncio.shield(task)
+
+    async def _request(self, params):
+        """일시적인 오류는 지터를 준 지수 백오프로 재시도합니다."""
+        for attempt in range(self.api.max_retries + 1):
+            is_last_attempt = attempt == self.api.max_retries
+            try:
+                response = await self.http.get(self.api.base_url, params=params)
+                if response.status_code not in RETRY_STATUS_CODES or is_last_attempt:
+                    return response
+            except httpx.TransportError:
+                if is_last_attempt:
+                    raise
+            await asyncio.sleep(random.uniform(0, 0.5 * (2 ** attempt)))
+
+    async def _fetch_bookstores(self, keyword=None, page_no=1, num_of_rows=10):
+        """API 서버에 서점 검색을 비동기로 요청합니다."""
+        params = self.api.build_params(keyword, page_no, num_of_rows)
+
+        # 서킷이 열려 있으면 API 서버를 호출하지 않고 바로 실패 (자리를 기다리지도 않습니다)
+        if self.api.breaker.state == "open":
+            return self.api.circuit_open_error()
+
+        try:
+            logger.debug("API 요청: %s keyword=%s pageNo=%s numOfRows=%s",
+                         self.api.base_url, keyword, page_no, num_of_rows)
+
+            async with concurrency_slot(self.upstream_slots, self.api.upstream_limiter.wait_timeout) as acquired:
+                if not acquired:
+                    return self.api.overloaded_error()
+                # half_open의 시험 요청은 자리를 얻은 뒤에 써야 결과가 반드시 기록됩니다.
+                if not self.api.breaker.allow_request():
+                    return self.api.circuit_open_error()
+                with stage_timer("upstream"):
+                    response = await self._request(params)
+
+            return self.api.handle_response(response.status_code, response.content)
+
+        except httpx.TimeoutException:
+            return self.api.upstream_failure("timeout")
+        except httpx.HTTPError as e:
+            logger.warning("API 요청 오류: %s", main.redact_service_key(e))
+            return self.api.upstream_failure("network")
+        except Exception as e:
+            logger.exception("처리 중 오류 발생: %s", e)
+            return {"error": f"처리 중 오류가 발생했습니다: {str(e)}"}
+
+async def get_ai_analysis(keyword, stores):
+    """main.get_ai_analysis의 비동기 버전입니다."""
+    try:
+        message = main.ai_analysis_unavailable_message(keyword, stores)
+        if message:
+            return message
+
+        # 같은 키워드와 같은 상위 서점에 대한 분석은 캐시에서 반환
+        cache_key = analysis_cache.fingerprint(keyword, stores)
+        cached_analysis = analysis_cache.get(cache_key)
+        if cached_analysis is not None:
+            return cached_analysis
+
+        client = async_openai_client.get()
+        if client is None:
+            return main.OPENAI_UNAVAILABLE_MESSAGE
+
+        async with concurrency_slot(ai_slots, main.ai_limiter.wait_timeout) as acquired:
+            if not acquired:
+                main.SHED_REQUESTS.inc("ai")
+                return main.AI_BUSY_MESSAGE
+            started_at = time.perf_counter()
+            with stage_timer("ai"):
+                response = await client.chat.completions.create(
+                    **main.build_ai_analysis_request(keyword, stores)
+                )
+
+        return main.record_ai_analysis(cache_key, response, started_at)
+
+    except Exception as e:
+        logger.warning("AI 분석 중 오류 발생: %s", e)
+        return f"AI 분석 중 오류가 발생했습니다: {str(e)}"
+
+bookstore_client = AsyncBookstoreClient(api)
+
+# 메인 페이지는 요청마다 달라지지 않으므로 Flask 템플릿을 한 번만 렌더링합니다.
+with main.app.test_request_context("/"):
+    INDEX_HTML = main.render_template("index.html")
+
+async def index(request):
+    """메인 페이지"""
+    return HTMLResponse(INDEX_HTML)
+
+class FingerprintedStaticFiles(StaticFiles):
+    """main.static_fingerprint와 같은 지문(v=...)이 붙은 요청은 변경 불가(immutable)로 캐시하게 합니다."""
+
+    async def get_response(self, path, scope):
+        response = await super().get_response(path, scope)
+        fingerprint = dict(httpx.QueryParams(scope["query_string"].decode("latin-1"))).get("v")
+        if response.status_code == 200 and fingerprint and fingerprint == main.static_fingerprint(path):
+            response.headers["Cache-Control"] = main.IMMUTABLE_CACHE_CONTROL
+        return response
+
+def etag_headers(etag):
+    # GZipMiddleware는 압축 방식별로 ETag를 바꾸지 않으므로 약한 ETag를 씁니다.
+    return {"ETag": f'W/"{etag}"', "Cache-Control": "no-cache"}
+
+def not_modified(request, etag):
+    """main.not_modified와 같이 GET/HEAD의 If-None-Match가 같으면 304 응답을, 아니면 None을 반환합니다."""
+    if request.method not in ("GET", "HEAD"):
+        return None
+    if_none_match = request.headers.get("if-none-match", "")
+    client_etags = {tag.strip().removeprefix("W/").strip('"') for tag in if_none_match.split(",")}
+    if etag in client_etags or "*" in client_etags:
+        return Response(status_code=304, headers=etag_headers(etag))
+    return None
+
+def rate_limited_response(request, endpoint):
+    """main.enforce_rate_limit와 같은 한도를 적용합니다. 한도를 넘으면 429 응답을, 아니면 None을 반환합니다."""
+    client = main.rate_limit_client_id(
+        request.client.host if request.client else None,
+        request.headers.get("x-forwarded-for")
+    )
+    retry_seconds = main.rate_limit_retry_after(client, endpoint)
+    if retry_seconds is None:
+        return None
+    return JSONResponse(main.rate_limit_error(retry_seconds), status_code=429, headers={"Retry-After": str(retry_seconds)})
+
+async def search(request):
+    """서점 검색 API (GET은 ETag로 브라우저 캐시를 재검증할 수 있습니다)"""
+    limited = rate_limited_response(request, "search")
+    if limited is not None:
+        return limited
+
+    form = request.query_params if request.method == "GET" else await request.form()
+    keyword = form.get("keyword", "")
+    page = int(form.get("page", 1))
+
+    if not keyword:
+        return JSONResponse({"error": "검색어를 입력해주세요."})
+
+    logger.debug("검색 요청: 키워드='%s', 페이지=%d", keyword, page)
+
+    if os.getenv("USE_DUMMY_DATA", "false").lower() == "true":
+        return JSONResponse(get_test_mode_response())
+
+    result = await bookstore_client.search_bookstores(keyword=keyword, page_no=page)
+    if "error" in result:
+        logger.info("API 오류: %s", result["error"])
+        return JSONResponse({
+            "error": result["error"],
+            "suggestion": get_search_suggestion()
+        })
+
+    with stage_timer("rank"):
+        ranked = main.rank_stores(keyword, result["stores"], main.parse_origin(form))
+
+    with stage_timer("format"):
+        formatted_stores = [
+            format_bookstore_info(store, features, distance) for store, features, distance in ranked
+        ]
+
+    main.suggestions.add(keyword, "query")
+    main.suggestions.add_stores(result["stores"])
+    main.cache_warmer.record(keyword)
+
+    # 결과가 같으면 AI 분석을 하지 않고 304로 응답합니다.
+    results = {
+        "stores": formatted_stores,
+        "total_count": result["total_count"],
+        "data_source": result.get("data_source", "real_api")
+    }
+    etag = main.results_etag(results)
+    cached_response = not_modified(request, etag)
+    if cached_response is not None:
+        return cached_response
+
+    payload = dict(results, ai_analysis=await get_ai_analysis(keyword, formatted_stores))
+    return Response(
+        json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+        media_type="application/json",
+        headers=etag_headers(etag)
+    )
+
+async def suggest(request):
+    """검색어 자동완성 API (main.py의 /suggest와 같은 색인을 사용합니다)"""
+    limited = rate_limited_response(request, "suggest")
+    if limited is not None:
+        return limited
+
+    try:
+        k = min(int(request.query_params.get("k", 10)), 20)
+    except ValueError:
+        k = 10
+    return JSONResponse({"suggestions": main.suggest_candidates(request.query_params.get("q", ""), k)})
+
+async def exit_app(request):
+    """앱 종료 (세션 쿠키를 지우고 홈으로 리디렉션)"""
+    response = RedirectResponse(url="/", status_code=302)
+    response.delete_cookie(main.app.config["SESSION_COOKIE_NAME"])
+    return response
+
+@asynccontextmanager
+async def lifespan(app):
+    await bookstore_client.start()
+    try:
+        yield
+    finally:
+        await bookstore_client.close()
+
+app = Starlette(
+    routes=[
+        Route("/", index),
+        Route("/search", search, methods=["GET", "POST"]),
+        Route("/suggest", suggest),
+        Route("/exit", exit_app),
+        Mount("/static", app=FingerprintedStaticFiles(directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")), name="static")
+    ],
+    middleware=[Middleware(GZipMiddleware, minimum_size=main.COMPRESS_MIN_SIZE)],
+    lifespan=lifespan
+)
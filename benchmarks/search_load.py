@@ -0,0 +1,319 @@
+"""/search 처리량과 지연 시간을 측정하는 부하 테스트
+
+가짜 문화공공데이터 API(XML)와 가짜 OpenAI chat completions 서버를 로컬에 띄우고,
+gunicorn으로 main:app(또는 asgi:app)을 실행한 뒤 동시 접속 수를 바꿔가며 /search를 호출합니다.
+결과(p50/p95/p99, 초당 요청 수, 메모리, 단계별 소요 시간)는 JSON으로 저장하여
+실행 간에 비교할 수 있습니다.
+
+사용법:
+    python benchmarks/search_load.py --concurrency 1 4 16 --requests 200
+    python benchmarks/search_load.py --compare benchmarks/results/이전결과.json
+    python benchmarks/search_load.py --app asgi  # 비동기 진입점 측정
+
+단계별 소요 시간은 앱이 보내는 Server-Timing 헤더(upstream, parse, format, ai)에서 읽습니다.
+측정 중에는 검색/AI 분석 캐시를 끄고 실행합니다.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+
+KEYWORDS = ["강남", "홍대", "서울", "구로", "부산", "종로", "마포", "성수"]
+
+ITEM_TEMPLATE = (
+    "<item><TITLE>{keyword} 북카페 {i}</TITLE>"
+    "<ADDRESS>서울특별시 {keyword} 인근 {i}번지</ADDRESS>"
+    "<CONTACT_POINT>02-123-{i:04d}</CONTACT_POINT>"
+    "<DESCRIPTION>{keyword} 지역에 위치한 아늑한 분위기의 북카페입니다.</DESCRIPTION>"
+    "<SUB_DESCRIPTION>영업시간: 10:00-22:00, 주차 가능, 와이파이 제공</SUB_DESCRIPTION>"
+    "<COORDINATES>37.5{i:03d},126.9{i:03d}</COORDINATES></item>"
+)
+
+def free_port():
+    """사용하지 않는 로컬 포트를 찾습니다."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def make_kcisa_handler(latency_ms, total_count):
+    """설정한 지연 시간 뒤에 XML을 돌려주는 가짜 문화공공데이터 API 핸들러를 만듭니다."""
+
+    class KcisaHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+            num_of_rows = int(params.get("numOfRows", 10))
+            page_no = int(params.get("pageNo", 1))
+            keyword = params.get("keyword", "서울")
+            start = (page_no - 1) * num_of_rows
+            count = max(0, min(num_of_rows, total_count - start))
+
+            time.sleep(latency_ms / 1000)
+            items = "".join(ITEM_TEMPLATE.format(keyword=keyword, i=start + i) for i in range(count))
+            body = (
+                "<?xml version=\"1.0\" encoding=\"UTF-8\"?>"
+                "<response><header><resultCode>0000</resultCode><resultMsg>OK</resultMsg></header>"
+                f"<body><items>{items}</items><numOfRows>{num_of_rows}</numOfRows>"
+                f"<pageNo>{page_no}</pageNo><totalCount>{total_count}</totalCount></body></response>"
+            ).encode("utf-8")
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/xml; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return KcisaHandler
+
+def make_openai_handler(latency_ms):
+    """설정한 지연 시간 뒤에 고정된 답변을 돌려주는 가짜 OpenAI chat completions 핸들러를 만듭니다."""
+
+    class OpenAIHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latency_ms / 1000)
+            body = json.dumps({
+                "id": "chatcmpl-bench",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": "gpt-3.5-turbo",
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "벤치마크용 AI 분석 결과입니다."},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": 200, "completion_tokens": 100, "total_tokens": 300}
+            }).encode("utf-8")
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return OpenAIHandler
+
+class StandInServer(ThreadingHTTPServer):
+    """동시 접속이 많아도 연결이 거부되지 않도록 대기열을 늘린 가짜 서버"""
+    request_queue_size = 256
+    daemon_threads = True
+
+def start_server(handler):
+    """핸들러로 로컬 HTTP 서버를 백그라운드 스레드에서 실행합니다."""
+    server = StandInServer(("127.0.0.1", free_port()), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def start_app(port, kcisa_port, openai_port, args):
+    """가짜 서버를 바라보도록 환경 변수를 설정하고 gunicorn으로 앱을 실행합니다."""
+    env = dict(
+        os.environ,
+        CULTURE_API_URL=f"http://127.0.0.1:{kcisa_port}/openapi/API_CIA_090/request",
+        CULTURE_API_KEY="bench-key",
+        OPENAI_API_KEY="bench-key",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{openai_port}/v1",
+        CATALOG_SNAPSHOT_PATH=os.path.join(RESULTS_DIR, "no-catalog.json"),
+        SEARCH_CACHE_TTL="0",
+        SEARCH_CACHE_STALE_TTL="0",
+        ANALYSIS_CACHE_BACKEND="memory",
+        ANALYSIS_CACHE_TTL="0",
+        UPSTREAM_XML_PARSER=args.xml_parser,
+        WARMUP_ENABLED="false",
+        RATE_LIMIT_ENABLED="false"
+    )
+    command = [
+        sys.executable, "-m", "gunicorn", f"{args.app}:app",
+        "--bind", f"127.0.0.1:{port}",
+        "--workers", str(args.workers),
+        "--threads", str(args.threads),
+        "--log-level", "warning"
+    ]
+    if args.app == "asgi":
+        command += ["--worker-class", "uvicorn.workers.UvicornWorker"]
+
+    process = subprocess.Popen(
+        command,
+        cwd=ROOT_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL
+    )
+
+    # 앱이 요청을 받을 수 있을 때까지 대기
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return process
+        except requests.exceptions.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("gunicorn이 30초 안에 시작되지 않았습니다.")
+
+def process_rss_kb(pid):
+    """프로세스와 자식 프로세스의 RSS(KB) 합계를 반환합니다. /proc이 없으면 None을 반환합니다."""
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            pids += [int(child) for child in f.read().split()]
+    except OSError:
+        return None
+
+    total = 0
+    for target in pids:
+        try:
+            with open(f"/proc/{target}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+        except OSError:
+            pass
+    return total
+
+def parse_server_timing(header):
+    """'upstream;dur=12.3, parse;dur=1.0' 형식의 헤더를 딕셔너리로 변환합니다."""
+    timings = {}
+    for part in (header or "").split(","):
+        name, _, duration = part.strip().partition(";dur=")
+        if name and duration:
+            timings[name] = float(duration)
+    return timings
+
+def percentile(values, p):
+    """정렬된 값 목록에서 백분위 값을 구합니다."""
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, int(round(p / 100 * len(values))) - 1))
+    return round(values[index], 2)
+
+def summarize(values):
+    values = sorted(values)
+    return {
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "mean": round(sum(values) / len(values), 2) if values else None
+    }
+
+def run_level(url, concurrency, total_requests):
+    """주어진 동시 접속 수로 /search를 호출하고 결과를 요약합니다."""
+    local = threading.local()
+
+    def one_request(i):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        keyword = KEYWORDS[i % len(KEYWORDS)]
+        started_at = time.perf_counter()
+        response = local.session.post(url, data={"keyword": keyword, "page": random.randint(1, 3)}, timeout=60)
+        elapsed_ms = (time.perf_counter() - started_at) * 1000
+        ok = response.status_code == 200 and "error" not in response.json()
+        return elapsed_ms, ok, parse_server_timing(response.headers.get("Server-Timing"))
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one_request, range(total_requests)))
+    wall_seconds = time.perf_counter() - started_at
+
+    stages = {}
+    for _, _, timings in results:
+        for stage, duration in timings.items():
+            stages.setdefault(stage, []).append(duration)
+
+    return {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "errors": sum(1 for _, ok, _ in results if not ok),
+        "requests_per_second": round(total_requests / wall_seconds, 2),
+        "latency_ms": summarize([elapsed_ms for elapsed_ms, _, _ in results]),
+        "stages_ms": {stage: summarize(durations) for stage, durations in sorted(stages.items())}
+    }
+
+def compare(previous_path, current):
+    """이전 결과와 비교하여 동시 접속 수별 p95와 초당 요청 수 변화를 출력합니다."""
+    with open(previous_path, encoding="utf-8") as f:
+        previous = {level["concurrency"]: level for level in json.load(f)["levels"]}
+
+    print(f"\n{'동시접속':>8} {'p95 이전':>10} {'p95 현재':>10} {'rps 이전':>10} {'rps 현재':>10}")
+    for level in current["levels"]:
+        before = previous.get(level["concurrency"])
+        if before:
+            print(
+                f"{level['concurrency']:>8} {before['latency_ms']['p95']:>10} {level['latency_ms']['p95']:>10} "
+                f"{before['requests_per_second']:>10} {level['requests_per_second']:>10}"
+            )
+
+def main():
+    parser = argparse.ArgumentParser(description="/search 부하 테스트")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=200, help="동시 접속 수별 요청 수")
+    parser.add_argument("--app", choices=["main", "asgi"], default="main", help="main(Flask, 동기) 또는 asgi(비동기)")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn 워커 수")
+    parser.add_argument("--threads", type=int, default=1, help="gunicorn 워커당 스레드 수")
+    parser.add_argument("--upstream-latency", type=float, default=50, help="가짜 API 지연 시간 (ms)")
+    parser.add_argument("--openai-latency", type=float, default=300, help="가짜 OpenAI 지연 시간 (ms)")
+    parser.add_argument("--total-count", type=int, default=100, help="가짜 API 전체 서점 수")
+    parser.add_argument("--xml-parser", choices=["xmltodict", "iterparse"], default="xmltodict")
+    parser.add_argument("--output", help="결과 JSON 경로 (기본값: benchmarks/results/<시각>.json)")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON 경로")
+    args = parser.parse_args()
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    kcisa_server = start_server(make_kcisa_handler(args.upstream_latency, args.total_count))
+    openai_server = start_server(make_openai_handler(args.openai_latency))
+    app_port = free_port()
+    app_process = start_app(app_port, kcisa_server.server_port, openai_server.server_port, args)
+
+    try:
+        url = f"http://127.0.0.1:{app_port}/search"
+        run_level(url, 1, 5)  # 워커 예열
+
+        levels = []
+        for concurrency in args.concurrency:
+            level = run_level(url, concurrency, args.requests)
+            level["rss_kb"] = process_rss_kb(app_process.pid)
+            levels.append(level)
+            print(
+                f"동시접속 {concurrency:>3}: {level['requests_per_second']:>8} req/s, "
+                f"p50 {level['latency_ms']['p50']} ms, p95 {level['latency_ms']['p95']} ms, "
+                f"p99 {level['latency_ms']['p99']} ms, 오류 {level['errors']}건"
+            )
+            for stage, summary in level["stages_ms"].items():
+                print(f"    {stage:>9}: p50 {summary['p50']} ms, p95 {summary['p95']} ms")
+    finally:
+        app_process.terminate()
+        app_process.wait()
+        kcisa_server.shutdown()
+        openai_server.shutdown()
+
+    result = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "levels": levels
+    }
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\n결과 저장: {output}")
+
+    if args.compare:
+        compare(args.compare, result)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""main:app 시작 시간(콜드 스타트)을 측정하는 스크립트
+
+새 파이썬 프로세스에서 `import main`에 걸리는 시간과 첫 응답(GET /, 더미 데이터 POST /search)까지의
+시간을 여러 번 측정하고, `python -X importtime` 결과에서 시간이 오래 걸리는 최상위 모듈을 보여줍니다.
+서버리스(vercel.json) 환경에서는 이 시간이 콜드 스타트마다 더해집니다.
+
+사용법:
+    python benchmarks/startup.py [--runs 5] [--top 15] [--eager]
+
+--eager는 LAZY_INIT=false로 실행하여 지연 초기화를 끈 경우와 비교할 때 사용합니다.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 자식 프로세스에서 실행할 측정 코드
+MEASURE_SCRIPT = """
+import json, time
+started_at = time.perf_counter()
+import main
+imported_at = time.perf_counter()
+client = main.app.test_client()
+client.get("/")
+first_page_at = time.perf_counter()
+client.post("/search", data={"keyword": "강남"})
+first_search_at = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported_at - started_at) * 1000,
+    "first_page_ms": (first_page_at - started_at) * 1000,
+    "first_search_ms": (first_search_at - started_at) * 1000
+}))
+"""
+
+def child_env(eager):
+    env = dict(
+        os.environ,
+        WARMUP_ENABLED="false",
+        USE_DUMMY_DATA="true",
+        LAZY_INIT="false" if eager else "true"
+    )
+    return env
+
+def measure_once(eager):
+    """새 프로세스 하나에서 import와 첫 응답 시간을 잽니다."""
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE_SCRIPT],
+        cwd=ROOT_DIR, env=child_env(eager), capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def import_profile(eager, top):
+    """-X importtime 출력에서 main이 직접 불러오는 모듈을 누적 시간 순으로 반환합니다."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT_DIR, env=child_env(eager), capture_output=True, text=True, check=True
+    ).stderr
+
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # 들여쓰기 깊이가 main 바로 아래(2칸)인 모듈과 main 자신만 봅니다.
+        depth = len(name) - len(name.lstrip(" "))
+        if depth <= 3:
+            modules.append((int(cumulative) / 1000, name.strip()))
+    return sorted(modules, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description="main:app 시작 시간 측정")
+    parser.add_argument("--runs", type=int, default=5, help="측정 반복 횟수")
+    parser.add_argument("--top", type=int, default=15, help="출력할 모듈 수")
+    parser.add_argument("--eager", action="store_true", help="LAZY_INIT=false로 측정")
+    args = parser.parse_args()
+
+    runs = [measure_once(args.eager) for _ in range(args.runs)]
+    print(f"{'단계':>16} {'중앙값 ms':>10} {'최소 ms':>10}")
+    for key in ("import_ms", "first_page_ms", "first_search_ms"):
+        values = [run[key] for run in runs]
+        print(f"{key:>16} {statistics.median(values):>10.1f} {min(values):>10.1f}")
+
+    print(f"\n{'누적 ms':>10}  모듈")
+    for cumulative_ms, name in import_profile(args.eager, args.top):
+        print(f"{cumulative_ms:>10.1f}  {name}")
+
+if __name__ == "__main__":
+    main()
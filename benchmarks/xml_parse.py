@@ -0,0 +1,77 @@
+"""xmltodict 경로와 iterparse 경로의 응답 해석 속도/메모리를 비교하는 마이크로 벤치마크
+
+사용법:
+    python benchmarks/xml_parse.py [numOfRows ...]
+
+예시:
+    python benchmarks/xml_parse.py 10 1000 5000
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("WARMUP_ENABLED", "false")
+
+from main import api
+
+# 실제 응답과 비슷한 크기를 맞추기 위한 더미 item (사용하지 않는 필드 포함)
+ITEM_TEMPLATE = """<item>
+<TITLE>책과 커피 {i}호점</TITLE>
+<ADDRESS>서울특별시 마포구 월드컵북로 {i}</ADDRESS>
+<CONTACT_POINT>02-1234-{i:04d}</CONTACT_POINT>
+<DESCRIPTION>다양한 장르의 책과 맛있는 커피를 함께 즐길 수 있는 공간입니다.</DESCRIPTION>
+<SUB_DESCRIPTION>영업시간: 10:00-22:00, 주차 가능, 와이파이 제공</SUB_DESCRIPTION>
+<COORDINATES>37.{i:04d},126.{i:04d}</COORDINATES>
+<URL>https://example.com/store/{i}</URL>
+<CHARGE>무료</CHARGE>
+<PERIOD>상시</PERIOD>
+<REFERENCE_IDENTIFIER>store-{i}</REFERENCE_IDENTIFIER>
+</item>"""
+
+def build_response(num_of_rows):
+    """numOfRows개의 item을 가진 응답 XML 바이트를 만듭니다."""
+    items = "".join(ITEM_TEMPLATE.format(i=i) for i in range(num_of_rows))
+    return (
+        "<?xml version=\"1.0\" encoding=\"UTF-8\"?>"
+        "<response><header><resultCode>0000</resultCode><resultMsg>OK</resultMsg></header>"
+        f"<body><items>{items}</items><numOfRows>{num_of_rows}</numOfRows>"
+        f"<pageNo>1</pageNo><totalCount>{num_of_rows}</totalCount></body></response>"
+    ).encode("utf-8")
+
+def parse_with_xmltodict(content):
+    """기본 경로: 운영과 같이 handle_response가 응답 바이트를 xmltodict로 전체 변환합니다."""
+    return api.handle_response(200, content, "xmltodict")
+
+def parse_with_iterparse(content):
+    """UPSTREAM_XML_PARSER=iterparse 경로: 필요한 필드만 스트리밍으로 읽습니다."""
+    return api.handle_response(200, content, "iterparse")
+
+def measure(parse, content, repeat):
+    """평균 실행 시간(ms)과 최대 메모리 사용량(KB)을 측정합니다."""
+    started_at = time.perf_counter()
+    for _ in range(repeat):
+        parse(content)
+    elapsed_ms = (time.perf_counter() - started_at) * 1000 / repeat
+
+    tracemalloc.start()
+    parse(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed_ms, peak / 1024
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10, 100, 1000, 5000]
+
+    print(f"{'numOfRows':>10} {'parser':>10} {'ms':>10} {'peak KB':>10}")
+    for num_of_rows in sizes:
+        content = build_response(num_of_rows)
+        repeat = max(3, 2000 // num_of_rows)
+
+        # 두 경로가 같은 결과를 내는지 먼저 확인
+        assert len(parse_with_xmltodict(content)["stores"]) == len(parse_with_iterparse(content)["stores"])
+
+        for name, parse in (("xmltodict", parse_with_xmltodict), ("iterparse", parse_with_iterparse)):
+            elapsed_ms, peak_kb = measure(parse, content, repeat)
+            print(f"{num_of_rows:>10} {name:>10} {elapsed_ms:>10.2f} {peak_kb:>10.0f}")
@@ -1,43 +1,1442 @@
 import os
+import io
+import csv
+import logging
 import json
-import requests
+import time
+import hashlib
+import sqlite3
+import re
+import math
+import heapq
+import random
+import bisect
+import threading
+import gzip
+from functools import lru_cache
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import xmltodict
-from dotenv import load_dotenv
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session
+from xml.etree import ElementTree
+from flask import Flask, Response, g, has_request_context, render_template, request, jsonify, redirect, url_for, session, stream_with_context
 from flask_cors import CORS
-from colorama import Fore, Style, init
-
-# Initialize colorama
-init()
+from werkzeug.security import safe_join
 
+# brotli가 설치되어 있지 않으면 gzip만 사용합니다.
+try:
+    import brotli
+except ImportError:
+    brotli = None
 # Load environment variables
-load_dotenv()
+# load_dotenv()처럼 main.py가 있는 디렉터리부터 상위로 .env를 찾고, 찾았을 때만 python-dotenv를 불러옵니다.
+def _find_dotenv_path():
+    directory = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        candidate = os.path.join(directory, ".env")
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+_dotenv_path = _find_dotenv_path()
+if _dotenv_path is not None:
+    from dotenv import load_dotenv
+    load_dotenv(_dotenv_path)
+
+# 비싼 클라이언트(openai, requests)를 처음 사용할 때 만들지 여부
+LAZY_INIT = os.getenv("LAZY_INIT", "true").lower() == "true"
 
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)  # CORS 활성화
 app.secret_key = os.getenv("FLASK_SECRET_KEY", "default-secret-key")
+# 한글을 \uXXXX로 이스케이프하지 않고 UTF-8 그대로 보냅니다.
+app.json.ensure_ascii = False
 
-# OpenAI 클라이언트 초기화 (호환성 문제로 인해 try-except로 처리)
-try:
+class SamplingFilter(logging.Filter):
+    """WARNING 미만 로그는 일정 비율만 남기는 필터"""
+    
+    def __init__(self, sample_rate):
+        super().__init__()
+        self.sample_rate = sample_rate
+    
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.sample_rate
+
+# 로깅 설정 (LOG_LEVEL=DEBUG로 상세 로그, LOG_SAMPLE_RATE로 INFO/DEBUG 로그 샘플링)
+logger = logging.getLogger("cafe_bookstore")
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+_log_handler.addFilter(SamplingFilter(float(os.getenv("LOG_SAMPLE_RATE", 1.0))))
+logger.addHandler(_log_handler)
+logger.propagate = False
+
+def _escape_label_value(value):
+    """Prometheus 텍스트 형식에 맞게 레이블 값의 \\, ", 줄바꿈을 이스케이프합니다."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels):
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in labels) + "}" if labels else ""
+
+class Counter:
+    """레이블별로 값을 누적하는 Prometheus 카운터"""
+    
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.values = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+    
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(zip(self.label_names, label_values))} {value}")
+        return lines
+
+class Histogram:
+    """레이블별로 관측값 분포를 버킷에 누적하는 Prometheus 히스토그램"""
+    
+    DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.series = {}  # 레이블 값 → [버킷별 개수, 합계, 개수]
+        self._lock = threading.Lock()
+    
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            # 마지막 버킷보다 큰 값은 +Inf 버킷(전체 개수)에만 포함됩니다.
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+    
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, (bucket_counts, total, count) in sorted(self.series.items()):
+                labels = list(zip(self.label_names, label_values))
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', bound)])} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', '+Inf')])} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {round(total, 6)}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+# 프로세스별 지표 (gunicorn 워커가 여러 개면 워커마다 따로 집계됩니다)
+STAGE_DURATION = Histogram(
+    "bookstore_stage_duration_seconds",
+    "처리 단계별 소요 시간 (upstream, parse, format, ai)",
+    ("stage",)
+)
+REQUEST_DURATION = Histogram(
+    "bookstore_http_request_duration_seconds",
+    "엔드포인트별 응답 시간",
+    ("endpoint", "status")
+)
+UPSTREAM_ERRORS = Counter(
+    "bookstore_upstream_errors_total",
+    "문화공공데이터 API 오류 (HTTP 상태 코드, resultCode, timeout, network)",
+    ("code",)
+)
+OPENAI_TOKENS = Counter(
+    "bookstore_openai_tokens_total",
+    "AI 분석에 사용한 토큰 수",
+    ("type",)
+)
+RATE_LIMITED = Counter(
+    "bookstore_rate_limited_total",
+    "요청 한도를 넘어 429로 거절한 요청 수",
+    ("endpoint",)
+)
+SHED_REQUESTS = Counter(
+    "bookstore_shed_requests_total",
+    "동시 실행 한도에 걸려 캐시나 AI 없는 응답으로 대신한 호출 수 (upstream, ai)",
+    ("target",)
+)
+
+@contextmanager
+def stage_timer(stage):
+    """처리 단계별 소요 시간을 히스토그램과 현재 요청의 Server-Timing 헤더에 기록합니다."""
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started_at
+        STAGE_DURATION.observe(elapsed, stage)
+        if has_request_context():
+            timings = g.setdefault("stage_timings", {})
+            timings[stage] = timings.get(stage, 0.0) + elapsed * 1000
+
+@app.before_request
+def start_request_timer():
+    g.request_started_at = time.perf_counter()
+
+@app.after_request
+def add_server_timing(response):
+    """응답 시간을 기록하고 단계별 소요 시간을 Server-Timing 헤더로 내보냅니다."""
+    started_at = g.get("request_started_at")
+    if started_at is not None:
+        REQUEST_DURATION.observe(
+            time.perf_counter() - started_at,
+            request.url_rule.rule if request.url_rule else "unmatched",
+            response.status_code
+        )
+    
+    timings = g.get("stage_timings")
+    if timings:
+        response.headers["Server-Timing"] = ", ".join(
+            f"{stage};dur={elapsed_ms:.1f}" for stage, elapsed_ms in timings.items()
+        )
+    return response
+
+# 압축할 응답 형식과 최소 크기 (작은 응답은 압축해도 이득이 없습니다)
+COMPRESSIBLE_MIMETYPES = {
+    "application/json", "application/javascript", "text/javascript", "text/css", "text/html",
+    "text/plain", "text/csv", "application/x-ndjson", "image/svg+xml"
+}
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", 500))
+COMPRESS_MAX_SIZE = 5 * 1024 * 1024
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 5))
+
+# 지문이 붙은 정적 파일 URL은 내용이 바뀌면 주소도 바뀌므로 오래 캐시해도 됩니다.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def negotiate_encoding(accept_encodings):
+    """Accept-Encoding에서 br(설치된 경우) 또는 gzip 중 선호도가 높은 쪽을 고릅니다."""
+    candidates = [("br", accept_encodings["br"])] if brotli is not None else []
+    candidates.append(("gzip", accept_encodings["gzip"]))
+    encoding, quality = max(candidates, key=lambda candidate: candidate[1])
+    return encoding if quality > 0 else None
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+@app.before_request
+def strip_encoding_etag_suffix():
+    """압축하면서 ETag에 붙인 '-br', '-gzip'을 떼어 원래 ETag로 비교하게 합니다.
+    
+    뗀 압축 방식은 기억해 두었다가 304 응답의 ETag에 다시 붙입니다.
+    """
+    if_none_match = request.environ.get("HTTP_IF_NONE_MATCH")
+    if if_none_match:
+        g.etag_encodings = set(re.findall(r'-(br|gzip)"', if_none_match))
+        request.environ["HTTP_IF_NONE_MATCH"] = re.sub(r'-(?:br|gzip)"', '"', if_none_match)
+
+@app.after_request
+def compress_response(response):
+    """클라이언트가 지원하면 응답 본문을 brotli 또는 gzip으로 압축합니다.
+    
+    스트리밍 응답(/export, SSE)은 한 번에 보내지 않으므로 압축하지 않습니다.
+    """
+    response.vary.add("Accept-Encoding")
+    if response.status_code == 304:
+        # 304는 클라이언트가 가진 (압축된) 표현과 같은 ETag를 보내야 합니다.
+        encoding = negotiate_encoding(request.accept_encodings)
+        etag, weak = response.get_etag()
+        if etag and not weak and encoding in g.get("etag_encodings", ()):
+            response.set_etag(f"{etag}-{encoding}")
+        return response
+    
+    if (
+        response.status_code != 200
+        or response.is_streamed and not response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        or not COMPRESS_MIN_SIZE <= (response.content_length or 0) <= COMPRESS_MAX_SIZE
+    ):
+        return response
+    
+    encoding = negotiate_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+    
+    # 정적 파일은 파일 객체로 전달되므로 메모리로 읽은 뒤 압축합니다.
+    response.direct_passthrough = False
+    with stage_timer("compress"):
+        response.set_data(compress(response.get_data(), encoding))
+    response.headers["Content-Encoding"] = encoding
+    
+    # 강한 ETag는 표현(압축 방식)마다 달라야 합니다.
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f"{etag}-{encoding}")
+    return response
+
+_static_fingerprints = {}
+
+def static_fingerprint(filename):
+    """정적 파일 내용의 해시 앞 12자리를 반환합니다. 파일이 바뀌면 다시 계산합니다."""
+    path = safe_join(app.static_folder, filename)
+    try:
+        mtime = os.stat(path).st_mtime
+    except (TypeError, OSError):
+        return None
+    
+    cached = _static_fingerprints.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, "rb") as f:
+            cached = (mtime, hashlib.sha256(f.read()).hexdigest()[:12])
+        _static_fingerprints[path] = cached
+    return cached[1]
+
+@app.url_defaults
+def add_static_fingerprint(endpoint, values):
+    """url_for('static', ...)에 내용 해시(v=...)를 붙입니다."""
+    if endpoint == "static" and "filename" in values and "v" not in values:
+        fingerprint = static_fingerprint(values["filename"])
+        if fingerprint:
+            values["v"] = fingerprint
+
+@app.after_request
+def cache_fingerprinted_static(response):
+    """지문이 현재 파일과 일치하는 정적 파일 요청은 변경 불가(immutable)로 캐시하게 합니다."""
+    if request.endpoint == "static" and response.status_code == 200:
+        fingerprint = request.args.get("v")
+        if fingerprint and fingerprint == static_fingerprint(request.view_args.get("filename", "")):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+def results_etag(results):
+    """검색 결과(서점 목록, 전체 건수, 출처)를 정렬된 키로 직렬화한 해시로 ETag 값을 만듭니다.
+    
+    AI 분석과 분석 작업 ID는 포함하지 않으므로 같은 결과면 항상 같은 값이 나옵니다.
+    """
+    body = json.dumps(results, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()[:32]
+
+def not_modified(etag):
+    """GET/HEAD 요청의 If-None-Match가 etag와 같으면 본문 없는 304 응답을, 아니면 None을 반환합니다."""
+    if request.method not in ("GET", "HEAD") or not request.if_none_match.contains_weak(etag):
+        return None
+    return with_etag(Response(status=304), etag)
+
+def with_etag(response, etag):
+    """강한 ETag를 붙이고, 저장은 하되 매번 서버에 확인하게 합니다."""
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+class LazyClient:
+    """처음 사용할 때 factory로 클라이언트를 만드는 지연 초기화 래퍼 (실패하면 None을 기억합니다)"""
+    
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+        self._client = None
+        self._failed = False
+        self._lock = threading.Lock()
+    
+    def get(self):
+        if self._client is None and not self._failed:
+            with self._lock:
+                if self._client is None and not self._failed:
+                    try:
+                        self._client = self.factory()
+                        logger.info("%s 클라이언트 초기화 성공", self.name)
+                    except Exception as e:
+                        logger.warning("%s 클라이언트 초기화 실패: %s", self.name, e)
+                        self._failed = True
+        return self._client
+
+def create_openai_client():
+    # openai 패키지는 불러오는 데만 수백 ms가 걸리므로 여기서 가져옵니다.
     from openai import OpenAI
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    print("OpenAI 클라이언트 초기화 성공")
-    openai_available = True
-except Exception as e:
-    print(f"OpenAI 클라이언트 초기화 실패: {str(e)}")
-    openai_available = False
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+# OpenAI 클라이언트 (호환성 문제로 초기화에 실패해도 앱은 동작합니다)
+openai_client = LazyClient("OpenAI", create_openai_client)
+
+class MemoryCacheBackend:
+    """프로세스 메모리에 저장하는 LRU 캐시 저장소"""
+    
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """(값, 저장 시각)을 반환합니다. 없으면 None을 반환합니다."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+    
+    def set(self, key, value, stored_at):
+        """값을 저장하고 용량을 넘으면 가장 오래 사용되지 않은 항목을 제거합니다."""
+        with self._lock:
+            self._entries[key] = (value, stored_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self):
+        return len(self._entries)
+
+class SQLiteCacheBackend:
+    """로컬 SQLite 파일에 저장하는 LRU 캐시 저장소 (gunicorn 워커 간 공유)"""
+    
+    def __init__(self, path, max_entries=512, touch_interval=60):
+        self.path = path
+        self.max_entries = max_entries
+        # 읽을 때마다 쓰기 잠금을 잡지 않도록 사용 시각은 이 간격(초)보다 오래됐을 때만 갱신합니다.
+        self.touch_interval = touch_interval
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+    
+    def _connect(self):
+        # 워커/스레드마다 연결을 새로 열어 sqlite 스레드 제약을 피합니다.
+        return sqlite3.connect(self.path, timeout=5)
+    
+    def get(self, key):
+        """(값, 저장 시각)을 반환합니다. 없으면 None을 반환합니다."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, stored_at, accessed_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if now - row[2] >= self.touch_interval:
+                conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0]), row[1]
+    
+    def set(self, key, value, stored_at):
+        """값을 저장하고 용량을 넘으면 가장 오래 사용되지 않은 항목을 제거합니다."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), stored_at, time.time())
+            )
+            conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                "SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+    
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+    
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache")
+    
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+class ResponseCache:
+    """TTL과 stale-while-revalidate를 지원하는 응답 캐시"""
+    
+    def __init__(self, backend, ttl=600, stale_ttl=3600):
+        self.backend = backend
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.stats = {"hits": 0, "misses": 0, "stale_hits": 0, "refreshes": 0}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+    
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+    
+    def lookup(self, key):
+        """(값, 상태)를 반환합니다. 상태는 "fresh", "stale", "miss" 중 하나입니다."""
+        entry = self.backend.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.time() - stored_at
+            if age < self.ttl:
+                self._count("hits")
+                return value, "fresh"
+            if age < self.ttl + self.stale_ttl:
+                self._count("stale_hits")
+                return value, "stale"
+        
+        self._count("misses")
+        return None, "miss"
+    
+    def store(self, key, value):
+        """"error"가 없는 결과만 저장합니다."""
+        if isinstance(value, dict) and "error" not in value:
+            self.backend.set(key, value, time.time())
+        return value
+    
+    def claim_refresh(self, key):
+        """백그라운드 갱신을 시작해도 되면 True를 반환합니다. 같은 키는 한 번에 하나만 갱신합니다."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+    
+    def release_refresh(self, key, refreshed=True):
+        with self._lock:
+            self._refreshing.discard(key)
+            if refreshed:
+                self.stats["refreshes"] += 1
+    
+    def get_or_fetch(self, key, fetch):
+        """캐시된 값을 반환하고, 없거나 만료되었으면 fetch()로 새로 가져옵니다.
+        
+        TTL이 지났지만 stale_ttl 이내인 값은 즉시 반환하고 백그라운드에서 갱신합니다.
+        fetch() 결과에 "error"가 있으면 캐시하지 않습니다.
+        """
+        value, state = self.lookup(key)
+        if state == "fresh":
+            return value
+        if state == "stale":
+            self._refresh_in_background(key, fetch)
+            return value
+        return self.store(key, fetch())
+    
+    def _refresh_in_background(self, key, fetch):
+        if not self.claim_refresh(key):
+            return
+        
+        def refresh():
+            refreshed = False
+            try:
+                self.store(key, fetch())
+                refreshed = True
+            finally:
+                self.release_refresh(key, refreshed)
+        
+        threading.Thread(target=refresh, daemon=True).start()
+    
+    def get_stats(self):
+        """히트/미스 통계를 반환합니다."""
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["entries"] = len(self.backend)
+        stats["hit_ratio"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+def create_search_cache():
+    """환경 변수 설정에 따라 검색 응답 캐시를 생성합니다."""
+    max_entries = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", 512))
+    if os.getenv("SEARCH_CACHE_BACKEND", "memory").lower() == "sqlite":
+        backend = SQLiteCacheBackend(os.getenv("SEARCH_CACHE_PATH", "search_cache.sqlite3"), max_entries)
+    else:
+        backend = MemoryCacheBackend(max_entries)
+    return ResponseCache(
+        backend,
+        ttl=int(os.getenv("SEARCH_CACHE_TTL", 600)),
+        stale_ttl=int(os.getenv("SEARCH_CACHE_STALE_TTL", 3600))
+    )
+
+# 행정구역 접미사 (검색어 '구로구' → '구로'로 정규화)
+ADMIN_SUFFIXES = ("특별시", "광역시", "시", "군", "구", "동", "읍", "면", "리")
+
+# 인덱스 대상 필드와 가중치
+INDEX_FIELDS = {"TITLE": 3, "ADDRESS": 2, "DESCRIPTION": 1, "SUB_DESCRIPTION": 1}
+
+def normalize_text(text):
+    """검색용으로 텍스트를 정규화합니다 (소문자, 특수문자 제거)."""
+    return re.sub(r"[^0-9a-z가-힣\s]", " ", str(text or "").lower())
+
+def strip_admin_suffix(word):
+    """'구로구', '서울시'처럼 행정구역 접미사가 붙은 단어에서 접미사를 제거합니다."""
+    for suffix in ADMIN_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+            return word[:-len(suffix)]
+    return word
+
+def unigram_tokens(text):
+    """한 글자 검색어('책', '숲')도 찾을 수 있도록 공백을 뺀 글자 하나하나를 토큰으로 만듭니다."""
+    return set("".join(normalize_text(text).split()))
+
+def bigram_tokens(text):
+    """한글 글자 단위 바이그램 토큰을 만듭니다. 한 글자 단어는 그대로 사용합니다."""
+    tokens = set()
+    for word in normalize_text(text).split():
+        if len(word) == 1:
+            tokens.add(word)
+        for i in range(len(word) - 1):
+            tokens.add(word[i:i + 2])
+    return tokens
+
+EARTH_RADIUS_KM = 6371.0
+
+def parse_coordinates(value):
+    """COORDINATES 문자열에서 (위도, 경도)를 추출합니다. 해석할 수 없으면 None을 반환합니다."""
+    numbers = re.findall(r"-?\d+(?:\.\d+)?", str(value or ""))
+    if len(numbers) < 2:
+        return None
+    lat, lng = float(numbers[0]), float(numbers[1])
+    # '경도,위도' 순서로 들어온 경우
+    if abs(lat) > 90 >= abs(lng):
+        lat, lng = lng, lat
+    if abs(lat) > 90 or abs(lng) > 180:
+        return None
+    return lat, lng
+
+def to_unit_vector(lat, lng):
+    """위경도를 단위 구 위의 3차원 좌표로 변환합니다."""
+    lat_rad, lng_rad = math.radians(lat), math.radians(lng)
+    return (
+        math.cos(lat_rad) * math.cos(lng_rad),
+        math.cos(lat_rad) * math.sin(lng_rad),
+        math.sin(lat_rad)
+    )
+
+def chord_to_km(chord):
+    """단위 구의 현 길이를 대원 거리(km)로 변환합니다."""
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+def km_to_chord(km):
+    """대원 거리(km)를 단위 구의 현 길이로 변환합니다."""
+    return 2 * math.sin(min(math.pi, km / EARTH_RADIUS_KM) / 2)
+
+class SpatialIndex:
+    """서점 좌표에 대한 3차원 k-d 트리 (최근접/반경 검색)"""
+    
+    def __init__(self, points):
+        # points: [(위도, 경도, doc_id), ...]
+        self.size = len(points)
+        self.root = self._build([(to_unit_vector(lat, lng), doc_id) for lat, lng, doc_id in points], 0)
+    
+    def _build(self, points, depth):
+        if not points:
+            return None
+        axis = depth % 3
+        points.sort(key=lambda p: p[0][axis])
+        mid = len(points) // 2
+        return (
+            points[mid][0], points[mid][1], axis,
+            self._build(points[:mid], depth + 1),
+            self._build(points[mid + 1:], depth + 1)
+        )
+    
+    def nearest(self, lat, lng, k=10, radius_km=None):
+        """(doc_id, 거리 km) 목록을 가까운 순으로 반환합니다."""
+        if k < 1:
+            return []
+        target = to_unit_vector(lat, lng)
+        max_sq = km_to_chord(radius_km) ** 2 if radius_km is not None else float("inf")
+        best = []  # (-거리², doc_id) 최대 힙
+        
+        def visit(node):
+            if node is None:
+                return
+            point, doc_id, axis, left, right = node
+            dist_sq = sum((a - b) ** 2 for a, b in zip(point, target))
+            if dist_sq <= max_sq:
+                if len(best) < k:
+                    heapq.heappush(best, (-dist_sq, doc_id))
+                elif dist_sq < -best[0][0]:
+                    heapq.heapreplace(best, (-dist_sq, doc_id))
+            
+            diff = target[axis] - point[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            visit(near)
+            bound = -best[0][0] if len(best) == k else max_sq
+            if diff * diff <= bound:
+                visit(far)
+        
+        visit(self.root)
+        return [(doc_id, round(chord_to_km(math.sqrt(-neg_sq)), 3)) for neg_sq, doc_id in sorted(best, reverse=True)]
+
+class BookstoreCatalog:
+    """전체 서점 목록 스냅샷과 메모리 역색인"""
+    
+    def __init__(self, stores):
+        self.stores = stores
+        self.postings = {}
+        self._spatial_index = None
+        for doc_id, store in enumerate(stores):
+            for field, weight in INDEX_FIELDS.items():
+                value = store.get(field)
+                for token in bigram_tokens(value) | unigram_tokens(value):
+                    postings = self.postings.setdefault(token, {})
+                    postings[doc_id] = postings.get(doc_id, 0) + weight
+    
+    @property
+    def spatial_index(self):
+        """좌표가 있는 서점들로 k-d 트리를 처음 사용할 때 한 번 만듭니다."""
+        if self._spatial_index is None:
+            points = []
+            for doc_id, store in enumerate(self.stores):
+                coordinates = parse_coordinates(store.get("COORDINATES"))
+                if coordinates:
+                    points.append((coordinates[0], coordinates[1], doc_id))
+            self._spatial_index = SpatialIndex(points)
+        return self._spatial_index
+    
+    def nearby(self, lat, lng, k=10, radius_km=None):
+        """주어진 위치에서 가까운 서점을 (서점, 거리 km) 목록으로 반환합니다."""
+        return [
+            (self.stores[doc_id], distance)
+            for doc_id, distance in self.spatial_index.nearest(lat, lng, k, radius_km)
+        ]
+    
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """스냅샷 파일 내용({"synced_at", "stores"})으로 카탈로그를 만듭니다."""
+        catalog = cls(snapshot["stores"])
+        logger.info("로컬 카탈로그 로드: %d개 서점", len(catalog.stores))
+        return catalog
+    
+    def search(self, keyword, page_no=1, num_of_rows=10):
+        """키워드로 서점을 검색합니다. search_bookstores와 같은 형식을 반환합니다."""
+        query_tokens = set()
+        for word in normalize_text(keyword).split():
+            query_tokens |= bigram_tokens(strip_admin_suffix(word))
+        
+        if not query_tokens:
+            return {"error": "검색 결과가 없습니다."}
+        
+        # 모든 토큰을 포함하는 문서만 남기고 가중치 합으로 정렬
+        postings = sorted((self.postings.get(token, {}) for token in query_tokens), key=len)
+        scores = dict(postings[0])
+        for posting in postings[1:]:
+            scores = {doc_id: score + posting[doc_id] for doc_id, score in scores.items() if doc_id in posting}
+            if not scores:
+                break
+        
+        if not scores:
+            return {"error": "검색 결과가 없습니다."}
+        
+        ranked = sorted(scores, key=lambda doc_id: (-scores[doc_id], doc_id))
+        start = (int(page_no) - 1) * int(num_of_rows)
+        page = ranked[start:start + int(num_of_rows)]
+        return {
+            "stores": [self.stores[doc_id] for doc_id in page],
+            "total_count": len(ranked),
+            "data_source": "local_catalog"
+        }
+
+# 한글 자모 분해용 표 (겹받침/겹모음은 입력 순서대로 나눕니다)
+CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+JUNGSEONG = ["ㅏ", "ㅐ", "ㅑ", "ㅒ", "ㅓ", "ㅔ", "ㅕ", "ㅖ", "ㅗ", "ㅗㅏ", "ㅗㅐ", "ㅗㅣ", "ㅛ", "ㅜ", "ㅜㅓ", "ㅜㅔ", "ㅜㅣ", "ㅠ", "ㅡ", "ㅡㅣ", "ㅣ"]
+JONGSEONG = ["", "ㄱ", "ㄲ", "ㄱㅅ", "ㄴ", "ㄴㅈ", "ㄴㅎ", "ㄷ", "ㄹ", "ㄹㄱ", "ㄹㅁ", "ㄹㅂ", "ㄹㅅ", "ㄹㅌ", "ㄹㅍ", "ㄹㅎ", "ㅁ", "ㅂ", "ㅂㅅ", "ㅅ", "ㅆ", "ㅇ", "ㅈ", "ㅊ", "ㅋ", "ㅌ", "ㅍ", "ㅎ"]
+
+def to_jamo(text):
+    """한글 음절을 자모 단위로 분해합니다. 입력 중인 글자('강ㄴ', '가나')도 접두어로 비교할 수 있습니다."""
+    result = []
+    for char in text:
+        code = ord(char) - 0xAC00
+        if 0 <= code < 11172:
+            result.append(CHOSEONG[code // 588] + JUNGSEONG[(code % 588) // 28] + JONGSEONG[code % 28])
+        else:
+            result.append(char)
+    return "".join(result)
+
+def deletion_variants(text):
+    """한 글자를 지운 문자열들 (편집 거리 1 이내 오타 검색용)"""
+    return {text[:i] + text[i + 1:] for i in range(len(text))}
+
+class SuggestionIndex:
+    """서점명, 주소의 시/구/동, 과거 검색어에 대한 자동완성 색인
+    
+    자모 단위로 정렬한 배열에서 이진 탐색으로 접두어를 찾고,
+    결과가 부족하면 자모 한 글자 삭제 색인으로 오타를 보정합니다.
+    """
+    
+    TYPES = ("store", "keyword", "region", "query")
+    
+    def __init__(self, max_queries=1000):
+        self.entries = {}    # 자모 키 → {"text", "type", "weight"}
+        self.sorted_keys = []
+        self.deletions = {}  # 자모 한 글자를 지운 키 → 원래 키 집합
+        self.max_queries = max_queries
+        self.query_keys = set()  # 검색어로만 들어온 후보 (개수 제한 대상)
+        self._lock = threading.Lock()
+    
+    def add(self, text, entry_type, weight=1):
+        """자동완성 후보를 추가하거나 가중치를 더합니다."""
+        text = " ".join(str(text or "").split())
+        key = to_jamo(normalize_text(text).replace(" ", ""))
+        if len(key) < 2:
+            return
+        
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                entry["weight"] += weight
+                # 같은 글자라면 지역/서점보다 실제 검색어로 보여줍니다.
+                if entry_type == "query":
+                    entry["type"] = "query"
+                else:
+                    # 서점/지역으로도 확인된 후보는 검색어 개수 제한에서 뺍니다.
+                    self.query_keys.discard(key)
+                return
+            
+            self.entries[key] = {"text": text, "type": entry_type, "weight": weight}
+            bisect.insort(self.sorted_keys, key)
+            for variant in deletion_variants(key):
+                self.deletions.setdefault(variant, set()).add(key)
+            
+            if entry_type == "query":
+                self.query_keys.add(key)
+                if len(self.query_keys) > self.max_queries:
+                    # 검색어 후보는 가중치가 가장 낮은 것부터 버려 최대 max_queries개만 둡니다.
+                    self._remove(min(self.query_keys, key=lambda candidate: (self.entries[candidate]["weight"], candidate == key)))
+    
+    def _remove(self, key):
+        """후보 하나를 정렬 배열과 오타 색인에서 함께 지웁니다. (잠금을 잡은 상태에서 호출)"""
+        del self.entries[key]
+        self.query_keys.discard(key)
+        del self.sorted_keys[bisect.bisect_left(self.sorted_keys, key)]
+        for variant in deletion_variants(key):
+            keys = self.deletions.get(variant)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.deletions[variant]
+    
+    def add_stores(self, stores):
+        """API 원본 서점 목록에서 서점명, 서점명의 단어, 주소의 시/구/동을 추가합니다."""
+        for store in stores:
+            title = store.get("TITLE")
+            self.add(title, "store")
+            words = str(title or "").split()
+            if len(words) > 1:
+                for word in words:
+                    self.add(word, "keyword")
+            for word in str(store.get("ADDRESS") or "").split():
+                if word.endswith(ADMIN_SUFFIXES) and len(word) >= 2:
+                    # 짧은 지역명이 API 검색에 잘 맞으므로 접미사를 뗀 형태로 제안합니다.
+                    self.add(strip_admin_suffix(word), "region")
+    
+    def _prefix_matches(self, key, limit=200):
+        """자모 키로 시작하는 후보를 최대 limit개까지 반환합니다."""
+        start = bisect.bisect_left(self.sorted_keys, key)
+        matches = []
+        for candidate in self.sorted_keys[start:start + limit]:
+            if not candidate.startswith(key):
+                break
+            matches.append(candidate)
+        return matches
+    
+    def _fuzzy_matches(self, key):
+        """자모 편집 거리 1(삭제/추가/치환) 이내의 후보를 반환합니다."""
+        matches = set(self.deletions.get(key, ()))
+        for variant in deletion_variants(key):
+            if variant in self.entries:
+                matches.add(variant)
+            matches |= self.deletions.get(variant, set())
+        return matches
+    
+    def suggest(self, query, k=10):
+        """접두어가 일치하는 후보를 먼저, 부족하면 오타 보정 후보를 가중치 순으로 반환합니다."""
+        words = normalize_text(query).split()
+        key = to_jamo("".join(words))
+        if not key:
+            return []
+        
+        # '구로구'처럼 행정구역 접미사가 붙은 검색어는 '구로'로도 찾습니다.
+        keys = [key]
+        if words:
+            stripped_key = to_jamo("".join(words[:-1] + [strip_admin_suffix(words[-1])]))
+            if stripped_key != key:
+                keys.append(stripped_key)
+        
+        rank = lambda candidate: (-self.entries[candidate]["weight"], len(candidate), candidate)
+        ranked = []
+        for search_key in keys:
+            for candidate in sorted(self._prefix_matches(search_key), key=rank):
+                if candidate not in ranked:
+                    ranked.append(candidate)
+        
+        if len(ranked) < k and len(key) >= 3:
+            fuzzy_keys = self._fuzzy_matches(key) - set(ranked)
+            ranked += sorted(fuzzy_keys, key=rank)
+        
+        return [dict(self.entries[candidate]) for candidate in ranked[:k]]
+
+class AnalysisCache:
+    """키워드와 상위 3개 서점 내용의 해시를 키로 AI 분석 결과를 저장하는 캐시"""
+    
+    def __init__(self, backend, ttl=86400):
+        self.backend = backend
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0, "saved_tokens": 0, "saved_ms": 0.0}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def fingerprint(keyword, stores):
+        """정규화한 키워드와 상위 3개 서점의 제목/주소/설명으로 캐시 키를 만듭니다."""
+        normalized_keyword = " ".join(str(keyword or "").lower().split())
+        top_stores = [
+            [store.get("title", ""), store.get("address", ""), store.get("description", "")]
+            for store in stores[:3]
+        ]
+        payload = json.dumps([normalized_keyword, top_stores], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def _lookup(self, key):
+        """만료되지 않은 저장 값을 반환하고, 만료된 항목은 지웁니다. 통계는 바꾸지 않습니다."""
+        entry = self.backend.get(key)
+        if entry is not None and time.time() - entry[1] < self.ttl:
+            return entry[0]
+        if entry is not None:
+            self.backend.delete(key)
+        return None
+    
+    def get(self, key, count_miss=True):
+        """캐시된 분석 결과를 반환합니다. 없거나 만료되었으면 None을 반환합니다.
+        
+        곧이어 get_ai_analysis가 같은 키를 다시 조회하는 경우에는 count_miss=False로 미스를 한 번만 셉니다.
+        """
+        value = self._lookup(key)
+        if value is not None:
+            with self._lock:
+                self.stats["hits"] += 1
+                self.stats["saved_tokens"] += value.get("tokens", 0)
+                self.stats["saved_ms"] += value.get("elapsed_ms", 0.0)
+            return value["analysis"]
+        
+        if count_miss:
+            with self._lock:
+                self.stats["misses"] += 1
+        return None
+    
+    def peek(self, key):
+        """통계에 세지 않고 캐시된 분석 결과를 반환합니다. (작업 결과 폴링용)"""
+        value = self._lookup(key)
+        return value["analysis"] if value is not None else None
+    
+    def set(self, key, analysis, tokens, elapsed_ms):
+        """분석 결과와 생성에 든 토큰 수, 소요 시간을 저장합니다."""
+        self.backend.set(
+            key,
+            {"analysis": analysis, "tokens": tokens, "elapsed_ms": round(elapsed_ms, 1)},
+            time.time()
+        )
+    
+    def get_stats(self):
+        """히트율과 절약한 토큰/시간 통계를 반환합니다."""
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["saved_ms"] = round(stats["saved_ms"], 1)
+        stats["entries"] = len(self.backend)
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+def create_analysis_cache():
+    """환경 변수 설정에 따라 AI 분석 캐시를 생성합니다. 기본값은 로컬 SQLite 파일입니다."""
+    max_entries = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", 1024))
+    ttl = int(os.getenv("ANALYSIS_CACHE_TTL", 86400))
+    if os.getenv("ANALYSIS_CACHE_BACKEND", "sqlite").lower() == "sqlite":
+        try:
+            backend = SQLiteCacheBackend(os.getenv("ANALYSIS_CACHE_PATH", "analysis_cache.sqlite3"), max_entries)
+            return AnalysisCache(backend, ttl)
+        except (sqlite3.Error, OSError) as e:
+            # 읽기 전용 파일 시스템 등에서는 메모리 캐시로 대체
+            logger.warning("AI 분석 캐시 파일을 열 수 없어 메모리 캐시를 사용합니다: %s", e)
+    return AnalysisCache(MemoryCacheBackend(max_entries), ttl)
+
+class CircuitBreaker:
+    """연속 실패가 쌓이면 일정 시간 동안 요청을 차단하는 서킷 브레이커"""
+    
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.time() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+    
+    def allow_request(self):
+        """요청을 보내도 되는지 확인합니다. half_open 상태에서는 시험 요청 하나만 허용합니다."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "half_open":
+                # 시험 요청이 끝날 때까지 다른 요청은 차단
+                self.opened_at = time.time()
+                return True
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.time()
+
+class SingleFlight:
+    """같은 키로 동시에 들어온 요청을 하나의 실행으로 합칩니다."""
+    
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+    
+    def do(self, key, fn):
+        with self._lock:
+            event_result = self._calls.get(key)
+            leader = event_result is None
+            if leader:
+                event_result = (threading.Event(), {})
+                self._calls[key] = event_result
+        
+        event, result = event_result
+        if not leader:
+            event.wait()
+            return result["value"]
+        
+        try:
+            result["value"] = fn()
+        except Exception as e:
+            result["value"] = {"error": f"처리 중 오류가 발생했습니다: {str(e)}"}
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            event.set()
+        return result["value"]
+
+class ConcurrencyLimiter:
+    """동시에 실행할 수 있는 호출 수를 제한합니다. 자리가 나지 않으면 기다리지 않고 포기합니다."""
+    
+    def __init__(self, limit, wait_timeout=0.5):
+        self.limit = limit
+        self.wait_timeout = wait_timeout
+        self.in_flight = 0
+        self._semaphore = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def slot(self):
+        """자리를 얻으면 True, wait_timeout 안에 얻지 못하면 False를 넘깁니다."""
+        acquired = self._semaphore.acquire(timeout=self.wait_timeout)
+        if acquired:
+            with self._lock:
+                self.in_flight += 1
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                with self._lock:
+                    self.in_flight -= 1
+                self._semaphore.release()
+
+def take_token(tokens, updated_at, rate, burst, now):
+    """토큰 버킷을 채운 뒤 토큰 하나를 꺼냅니다.
+    
+    (허용 여부, 남은 토큰, 다시 시도할 수 있을 때까지의 초)를 반환합니다.
+    """
+    tokens = min(burst, tokens + (now - updated_at) * rate)
+    if tokens >= 1:
+        return True, tokens - 1, 0.0
+    return False, tokens, (1 - tokens) / rate
+
+class MemoryRateLimitStore:
+    """프로세스 메모리에 토큰 버킷을 저장합니다 (오래 쓰지 않은 클라이언트부터 지웁니다)."""
+    
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def take(self, key, rate, burst, now):
+        with self._lock:
+            tokens, updated_at = self.buckets.pop(key, (burst, now))
+            allowed, tokens, retry_after = take_token(tokens, updated_at, rate, burst, now)
+            self.buckets[key] = (tokens, now)
+            while len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        return allowed, retry_after
+    
+    def prune(self, prefix, idle_seconds, now):
+        """prefix로 시작하고 idle_seconds 동안 쓰지 않아 가득 찬 버킷을 지웁니다."""
+        with self._lock:
+            for key in [key for key, (_, updated_at) in self.buckets.items()
+                        if key.startswith(prefix) and updated_at <= now - idle_seconds]:
+                del self.buckets[key]
+
+class SQLiteRateLimitStore:
+    """로컬 SQLite 파일에 토큰 버킷을 저장합니다 (gunicorn 워커 간 공유)."""
+    
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+    
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5, isolation_level=None)
+    
+    def take(self, key, rate, burst, now):
+        conn = self._connect()
+        try:
+            # 워커들이 같은 버킷을 동시에 읽고 쓰지 않도록 쓰기 잠금을 먼저 잡습니다.
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated_at = row if row else (burst, now)
+            allowed, tokens, retry_after = take_token(tokens, updated_at, rate, burst, now)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                (key, tokens, now)
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return allowed, retry_after
+    
+    def prune(self, prefix, idle_seconds, now):
+        """prefix로 시작하고 idle_seconds 동안 쓰지 않아 가득 찬 버킷을 지웁니다. (없는 버킷과 같습니다)"""
+        conn = self._connect()
+        try:
+            # 기본 키 범위로 찾도록 prefix 끝의 ':' 다음 문자(';')를 상한으로 씁니다.
+            conn.execute(
+                "DELETE FROM buckets WHERE key >= ? AND key < ? AND updated_at <= ?",
+                (prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1), now - idle_seconds)
+            )
+        finally:
+            conn.close()
+
+def parse_rate_limits(spec):
+    """'search=20/60,export=2/60'을 {엔드포인트: (초당 토큰, 버킷 크기)}로 바꿉니다."""
+    limits = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        try:
+            endpoint, limit = item.split("=", 1)
+            requests_count, seconds = (float(value) for value in limit.split("/", 1))
+            if requests_count <= 0 or seconds <= 0:
+                raise ValueError
+        except ValueError:
+            # 잘못된 항목 때문에 앱이 시작하지 못하는 일이 없도록 건너뜁니다.
+            logger.warning("잘못된 RATE_LIMITS 항목을 건너뜁니다: %r", item)
+            continue
+        limits[endpoint.strip()] = (requests_count / seconds, requests_count)
+    return limits
+
+class RateLimiter:
+    """클라이언트와 엔드포인트별 토큰 버킷 요청 제한"""
+    
+    def __init__(self, store, limits, prune_interval=60):
+        self.store = store
+        self.limits = limits
+        # 엔드포인트마다 이 간격(초)으로 다시 가득 찬 버킷을 정리합니다.
+        self.prune_interval = prune_interval
+        self._last_pruned = {}
+    
+    def check(self, client_id, endpoint):
+        """(허용 여부, 다시 시도할 수 있을 때까지의 초)를 반환합니다. 제한이 없는 엔드포인트는 항상 허용합니다."""
+        limit = self.limits.get(endpoint)
+        if limit is None:
+            return True, 0.0
+        rate, burst = limit
+        now = time.time()
+        if now - self._last_pruned.get(endpoint, 0) >= self.prune_interval:
+            self._last_pruned[endpoint] = now
+            # burst / rate초 동안 쓰지 않은 버킷은 가득 찼으므로 지워도 결과가 같습니다.
+            self.store.prune(f"{endpoint}:", burst / rate, now)
+        return self.store.take(f"{endpoint}:{client_id}", rate, burst, now)
+
+# /suggest는 입력할 때마다, /analysis/<id>는 결과가 나올 때까지 폴링하므로 넉넉하게 둡니다.
+DEFAULT_RATE_LIMITS = "search=20/60,search_batch=5/60,export=2/60,suggest=600/60,analysis_result=300/60"
+
+def create_rate_limiter():
+    """환경 변수 설정에 따라 요청 제한기를 생성합니다."""
+    if os.getenv("RATE_LIMIT_BACKEND", "memory").lower() == "sqlite":
+        store = SQLiteRateLimitStore(os.getenv("RATE_LIMIT_PATH", "rate_limits.sqlite3"))
+    else:
+        store = MemoryRateLimitStore()
+    return RateLimiter(store, parse_rate_limits(os.getenv("RATE_LIMITS", DEFAULT_RATE_LIMITS)))
+
+# 요청 제한 (RATE_LIMIT_ENABLED=true일 때만 사용합니다)
+# Render/Vercel처럼 프록시 뒤에서는 모든 요청의 remote_addr가 프록시 주소이므로
+# RATE_LIMIT_TRUST_FORWARDED=true로 X-Forwarded-For의 클라이언트 주소를 써야 합니다.
+rate_limiter = create_rate_limiter() if os.getenv("RATE_LIMIT_ENABLED", "false").lower() == "true" else None
+if rate_limiter is not None and os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() != "true":
+    logger.warning("RATE_LIMIT_TRUST_FORWARDED가 꺼져 있습니다. 프록시 뒤라면 모든 사용자가 한도 하나를 공유합니다.")
+
+def rate_limit_client_id(remote_addr, forwarded_for=None):
+    """요청 제한에 사용할 클라이언트 식별자 (프록시 뒤라면 RATE_LIMIT_TRUST_FORWARDED=true)"""
+    if os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true" and forwarded_for:
+        return forwarded_for.split(",")[0].strip()
+    return remote_addr or "unknown"
+
+def rate_limit_retry_after(client, endpoint):
+    """한도를 넘었으면 Retry-After로 보낼 초를, 아니면 None을 반환합니다. (Flask와 asgi.py가 함께 사용)"""
+    if rate_limiter is None or endpoint not in rate_limiter.limits:
+        return None
+    
+    allowed, retry_after = rate_limiter.check(client, endpoint)
+    if allowed:
+        return None
+    
+    RATE_LIMITED.inc(endpoint)
+    return max(1, math.ceil(retry_after))
+
+def rate_limit_error(retry_seconds):
+    return {"error": f"요청이 너무 많습니다. {retry_seconds}초 후 다시 시도해주세요."}
+
+@app.before_request
+def enforce_rate_limit():
+    """클라이언트/엔드포인트별 한도를 넘으면 429와 Retry-After를 반환합니다."""
+    client = rate_limit_client_id(request.remote_addr, request.headers.get("X-Forwarded-For"))
+    retry_seconds = rate_limit_retry_after(client, request.endpoint)
+    if retry_seconds is None:
+        return None
+    
+    response = jsonify(rate_limit_error(retry_seconds))
+    response.status_code = 429
+    response.headers["Retry-After"] = str(retry_seconds)
+    return response
+
+# format_bookstore_info와 카탈로그 색인에 필요한 item 필드
+ITEM_FIELDS = ("TITLE", "ADDRESS", "CONTACT_POINT", "DESCRIPTION", "SUB_DESCRIPTION", "COORDINATES")
+
+# iterparse로 읽을 때 함께 모으는 헤더/본문 값
+HEADER_FIELDS = ("resultCode", "resultMsg", "totalCount")
+
+def iter_bookstore_items(content, header):
+    """응답 XML 바이트를 iterparse로 읽으며 item을 하나씩 반환합니다.
+    
+    전체 문서를 딕셔너리로 만들지 않고 ITEM_FIELDS만 꺼내며,
+    resultCode/resultMsg/totalCount는 header 딕셔너리에 채웁니다.
+    """
+    # 열린 요소 스택 (읽은 item을 부모 <items>에서 떼어내기 위해 사용)
+    open_elements = []
+    for event, elem in ElementTree.iterparse(io.BytesIO(content), events=("start", "end")):
+        if event == "start":
+            open_elements.append(elem)
+            continue
+        open_elements.pop()
+        if elem.tag == "item":
+            yield {
+                child.tag: child.text or ""
+                for child in elem
+                if child.tag in ITEM_FIELDS
+            }
+            # 읽은 item은 비우고 부모에서도 떼어내 트리가 item 수만큼 커지지 않게 합니다.
+            elem.clear()
+            if open_elements:
+                open_elements[-1].remove(elem)
+        elif elem.tag in HEADER_FIELDS:
+            header[elem.tag] = elem.text
+
+def parse_bookstore_response(content):
+    """iterparse 경로로 응답을 해석합니다. xmltodict 경로와 같은 형식을 반환합니다."""
+    header = {}
+    item_list = []
+    for item in iter_bookstore_items(content, header):
+        # 헤더가 본문보다 먼저 오므로 API 오류 응답이면 나머지를 읽지 않습니다.
+        if header.get("resultCode", "0000") != "0000":
+            break
+        item_list.append(item)
+    
+    if "resultCode" not in header:
+        return {"error": "API 응답 형식이 올바르지 않습니다."}
+    
+    # API 오류 확인
+    if header["resultCode"] != "0000":
+        UPSTREAM_ERRORS.inc(f"result_{header['resultCode']}")
+        return {"error": f"API 오류: {header.get('resultMsg')} (코드: {header['resultCode']})"}
+    
+    total_count = int(header.get("totalCount") or 0)
+    if total_count == 0 or not item_list:
+        return {"error": "검색 결과가 없습니다."}
+    
+    return {"stores": item_list, "total_count": total_count}
+
+# 예외 메시지에 들어가는 요청 URL의 API 키
+SERVICE_KEY_PATTERN = re.compile(r"(serviceKey=)[^&\s]*")
+
+def redact_service_key(text):
+    """로그에 남기기 전에 URL의 serviceKey 값을 가립니다."""
+    return SERVICE_KEY_PATTERN.sub(r"\1***", str(text))
+
+# 재시도할 HTTP 상태 코드
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
 
 class BookstoreAPI:
     """문화공공데이터 API를 통해 카페가 있는 서점 정보를 가져오는 클래스"""
     
-    def __init__(self):
-        self.base_url = "http://api.kcisa.kr/openapi/API_CIA_090/request"
+    def __init__(self, cache=None):
+        self.base_url = os.getenv("CULTURE_API_URL", "http://api.kcisa.kr/openapi/API_CIA_090/request")
         self.api_key = os.getenv("CULTURE_API_KEY")
         self.cached_bookstores = {}
+        self.cache = cache if cache is not None else create_search_cache()
+        self.catalog_path = os.getenv("CATALOG_SNAPSHOT_PATH", os.path.join("data", "bookstores_snapshot.json"))
+        # 스냅샷 파일이 바뀌면 (sync_catalog.py 실행 후) 워커마다 새 색인으로 교체합니다.
+        self._catalog = JsonFileIndex(self.catalog_path, BookstoreCatalog.from_snapshot)
+        
+        self._session = None
+        self._session_lock = threading.Lock()
+        self.max_retries = int(os.getenv("UPSTREAM_MAX_RETRIES", 2))
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv("UPSTREAM_BREAKER_THRESHOLD", 5)),
+            reset_timeout=int(os.getenv("UPSTREAM_BREAKER_RESET", 30))
+        )
+        self.single_flight = SingleFlight()
+        # 동시 API 호출 수 제한 (넘치면 기다리지 않고 캐시된 결과로 대신합니다)
+        self.upstream_limiter = ConcurrencyLimiter(
+            int(os.getenv("UPSTREAM_MAX_CONCURRENCY", os.getenv("UPSTREAM_POOL_SIZE", 10))),
+            wait_timeout=float(os.getenv("UPSTREAM_QUEUE_TIMEOUT", 1.0))
+        )
+        self.xml_parser = os.getenv("UPSTREAM_XML_PARSER", "xmltodict").lower()
+    
+    @property
+    def session(self):
+        """keep-alive 연결을 재사용하는 세션 (처음 API를 호출할 때 만듭니다)"""
+        return self.init_session()
+    
+    def init_session(self):
+        """세션이 없으면 만들고 반환합니다. 지연 초기화를 끄면 시작할 때 호출합니다."""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=int(os.getenv("UPSTREAM_POOL_SIZE", 10)))
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._session = session
+        return self._session
+    
+    @property
+    def catalog(self):
+        """로컬 스냅샷이 있으면 처음 사용할 때 불러와 색인하고, 파일이 바뀌면 다시 불러옵니다. 없으면 None입니다."""
+        try:
+            return self._catalog.get()
+        except FileNotFoundError:
+            return None
     
     def search_bookstores(self, keyword=None, page_no=1, num_of_rows=10):
-        """서점을 검색합니다."""
+        """서점을 검색합니다.
+        
+        로컬 카탈로그 스냅샷이 있으면 메모리 색인에서 바로 찾고,
+        없으면 (keyword, page_no, num_of_rows) 단위로 캐시하며 API를 호출합니다.
+        """
+        if keyword and self.catalog is not None:
+            return self.catalog.search(keyword, page_no, num_of_rows)
+        
+        cache_key = self.cache_key(keyword, page_no, num_of_rows)
+        result = self.cache.get_or_fetch(
+            cache_key,
+            lambda: self.single_flight.do(
+                cache_key,
+                lambda: self._fetch_bookstores(keyword, page_no, num_of_rows)
+            )
+        )
+        return self.fallback_to_cache(cache_key, result)
+    
+    @staticmethod
+    def cache_key(keyword=None, page_no=1, num_of_rows=10):
+        return json.dumps([keyword or "", int(page_no), int(num_of_rows)], ensure_ascii=False)
+    
+    def fallback_to_cache(self, cache_key, result):
+        """API 서버 장애 시에는 만료된 캐시라도 있으면 반환합니다."""
+        if result.get("upstream_unavailable"):
+            entry = self.cache.backend.get(cache_key)
+            if entry is not None:
+                logger.warning("API 서버 장애로 만료된 캐시 사용: %s", cache_key)
+                return entry[0]
+        return result
+    
+    def _request(self, params):
+        """세션으로 API를 호출하고, 일시적인 오류는 지터를 준 지수 백오프로 재시도합니다."""
+        import requests
+        
+        for attempt in range(self.max_retries + 1):
+            is_last_attempt = attempt == self.max_retries
+            try:
+                response = self.session.get(self.base_url, params=params, timeout=10)
+                if response.status_code not in RETRY_STATUS_CODES or is_last_attempt:
+                    return response
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+                if is_last_attempt:
+                    raise
+            time.sleep(random.uniform(0, 0.5 * (2 ** attempt)))
+    
+    def _fetch_bookstores(self, keyword=None, page_no=1, num_of_rows=10, xml_parser=None):
+        """API 서버에 서점 검색을 요청합니다."""
+        import requests
+        
+        params = self.build_params(keyword, page_no, num_of_rows)
+        
+        # 서킷이 열려 있으면 API 서버를 호출하지 않고 바로 실패 (자리를 기다리지도 않습니다)
+        if self.breaker.state == "open":
+            return self.circuit_open_error()
+        
+        try:
+            # 디버깅을 위한 로그 (serviceKey는 남기지 않습니다)
+            logger.debug("API 요청: %s keyword=%s pageNo=%s numOfRows=%s",
+                         self.base_url, keyword, page_no, num_of_rows)
+            
+            # 타임아웃과 재시도는 _request에서 처리
+            with self.upstream_limiter.slot() as acquired:
+                if not acquired:
+                    return self.overloaded_error()
+                # half_open의 시험 요청은 자리를 얻은 뒤에 써야 결과(성공/실패)가 반드시 기록됩니다.
+                if not self.breaker.allow_request():
+                    return self.circuit_open_error()
+                with stage_timer("upstream"):
+                    response = self._request(params)
+            
+            return self.handle_response(response.status_code, response.content, xml_parser)
+            
+        except requests.exceptions.Timeout:
+            return self.upstream_failure("timeout")
+        except requests.exceptions.RequestException as e:
+            logger.warning("API 요청 오류: %s", redact_service_key(e))
+            return self.upstream_failure("network")
+        except Exception as e:
+            logger.exception("처리 중 오류 발생: %s", e)
+            return {"error": f"처리 중 오류가 발생했습니다: {str(e)}"}
+    
+    def build_params(self, keyword=None, page_no=1, num_of_rows=10):
+        """API 요청 파라미터를 만듭니다."""
         params = {
             "serviceKey": self.api_key,
             "numOfRows": str(num_of_rows),
@@ -46,63 +1445,107 @@ class BookstoreAPI:
         
         if keyword:
             params["keyword"] = keyword
+        return params
+    
+    def overloaded_error(self):
+        """동시 호출 한도를 넘은 경우의 응답 (fallback_to_cache가 만료된 캐시라도 찾아 반환합니다)"""
+        SHED_REQUESTS.inc("upstream")
+        return {
+            "error": "요청이 많아 잠시 결과를 가져올 수 없습니다. 잠시 후 다시 시도해주세요.",
+            "upstream_unavailable": True
+        }
+    
+    def circuit_open_error(self):
+        return {
+            "error": "API 서버가 일시적으로 응답하지 않습니다. 잠시 후 다시 시도해주세요.",
+            "upstream_unavailable": True
+        }
+    
+    def upstream_failure(self, code):
+        """시간 초과/네트워크 오류를 기록하고 오류 응답을 만듭니다."""
+        UPSTREAM_ERRORS.inc(code)
+        self.breaker.record_failure()
+        if code == "timeout":
+            return {
+                "error": "API 서버 응답 시간 초과. 잠시 후 다시 시도해주세요.",
+                "upstream_unavailable": True
+            }
+        return {
+            "error": "네트워크 오류: API 서버에 연결할 수 없습니다.",
+            "upstream_unavailable": True
+        }
+    
+    def handle_response(self, status_code, content, xml_parser=None):
+        """API 응답 상태 코드와 본문(bytes)을 해석합니다.
         
-        try:
-            # 디버깅을 위한 로그 추가
-            print(f"API 요청 URL: {self.base_url}")
-            print(f"API 요청 파라미터: {params}")
-            
-            # 타임아웃 설정 추가
-            response = requests.get(self.base_url, params=params, timeout=10)
-            
-            # 응답 상태 코드 확인
-            print(f"API 응답 상태 코드: {response.status_code}")
+        xml_parser가 "iterparse"이면 응답 바이트를 스트리밍으로 해석하고,
+        그렇지 않으면 기존처럼 xmltodict로 전체를 변환합니다.
+        """
+        # 응답 상태 코드 확인
+        logger.debug("API 응답 상태 코드: %d", status_code)
+        
+        if status_code != 200:
+            UPSTREAM_ERRORS.inc(str(status_code))
+        
+        if status_code in RETRY_STATUS_CODES:
+            self.breaker.record_failure()
+            return {
+                "error": f"API 서버 오류: 상태 코드 {status_code}",
+                "upstream_unavailable": True
+            }
+        self.breaker.record_success()
+        
+        if status_code != 200:
+            return {"error": f"API 서버 오류: 상태 코드 {status_code}"}
+        
+        # 응답 내용 확인 (디버깅용, DEBUG 레벨이 아니면 디코딩하지 않습니다)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("API 응답 내용 일부: %s...", content[:200].decode("utf-8", "replace"))
+        
+        if (xml_parser or self.xml_parser) == "iterparse":
+            with stage_timer("parse"):
+                return parse_bookstore_response(content)
+        
+        # XML을 딕셔너리로 변환
+        with stage_timer("parse"):
+            data = xmltodict.parse(content)
+        
+        # 응답 확인
+        if "response" in data:
+            header = data["response"].get("header", {})
+            result_code = header.get("resultCode")
+            result_msg = header.get("resultMsg")
             
-            if response.status_code != 200:
-                return {"error": f"API 서버 오류: 상태 코드 {response.status_code}"}
+            # API 오류 확인
+            if result_code != "0000":
+                UPSTREAM_ERRORS.inc(f"result_{result_code}")
+                return {"error": f"API 오류: {result_msg} (코드: {result_code})"}
             
-            # 응답 내용 확인 (디버깅용)
-            print(f"API 응답 내용 일부: {response.text[:200]}...")
+            body = data["response"].get("body", {})
+            total_count = int(body.get("totalCount", 0))
             
-            # XML을 딕셔너리로 변환
-            data = xmltodict.parse(response.text)
+            if total_count == 0:
+                return {"error": "검색 결과가 없습니다."}
             
-            # 응답 확인
-            if "response" in data:
-                header = data["response"].get("header", {})
-                result_code = header.get("resultCode")
-                result_msg = header.get("resultMsg")
-                
-                # API 오류 확인
-                if result_code != "0000":
-                    return {"error": f"API 오류: {result_msg} (코드: {result_code})"}
-                
-                body = data["response"].get("body", {})
-                total_count = int(body.get("totalCount", 0))
-                
-                if total_count == 0:
-                    return {"error": "검색 결과가 없습니다."}
-                
-                items = body.get("items", {})
-                if not items:
-                    return {"error": "검색 결과가 없습니다."}
-                
-                item_list = items.get("item", [])
-                if isinstance(item_list, dict):  # 단일 결과인 경우
-                    item_list = [item_list]
-                
-                return {"stores": item_list, "total_count": total_count}
+            items = body.get("items", {})
+            if not items:
+                return {"error": "검색 결과가 없습니다."}
             
-            return {"error": "API 응답 형식이 올바르지 않습니다."}
+            item_list = items.get("item", [])
+            if isinstance(item_list, dict):  # 단일 결과인 경우
+                item_list = [item_list]
             
-        except requests.exceptions.Timeout:
-            return {"error": "API 서버 응답 시간 초과. 잠시 후 다시 시도해주세요."}
-        except requests.exceptions.RequestException as e:
-            print(f"API 요청 오류: {str(e)}")
-            return {"error": "네트워크 오류: API 서버에 연결할 수 없습니다."}
-        except Exception as e:
-            print(f"처리 중 오류 발생: {str(e)}")
-            return {"error": f"처리 중 오류가 발생했습니다: {str(e)}"}
+            return {"stores": item_list, "total_count": total_count}
+        
+        return {"error": "API 응답 형식이 올바르지 않습니다."}
+    
+    def refresh_bookstores(self, keyword=None, page_no=1, num_of_rows=10):
+        """캐시 상태와 관계없이 API에서 다시 받아 캐시에 저장합니다 (캐시 예열용)."""
+        cache_key = self.cache_key(keyword, page_no, num_of_rows)
+        return self.cache.store(
+            cache_key,
+            self.single_flight.do(cache_key, lambda: self._fetch_bookstores(keyword, page_no, num_of_rows))
+        )
     
     def get_bookstore_details(self, store_id):
         """특정 서점의 상세 정보를 가져옵니다."""
@@ -114,8 +1557,172 @@ class BookstoreAPI:
             self.cached_bookstores[store_id] = result["stores"][0]
             return result["stores"][0]
         return None
+    
+    def sync_catalog(self, page_size=1000):
+        """API의 전체 데이터를 페이지 단위로 받아 로컬 스냅샷 파일로 저장합니다."""
+        stores = []
+        page_no = 1
+        while True:
+            result = self._fetch_bookstores(page_no=page_no, num_of_rows=page_size, xml_parser="iterparse")
+            if "error" in result:
+                if stores and result["error"] == "검색 결과가 없습니다.":
+                    break
+                return result
+            stores.extend(result["stores"])
+            logger.info("카탈로그 동기화: %d/%d", len(stores), result["total_count"])
+            if len(stores) >= result["total_count"] or len(result["stores"]) < page_size:
+                break
+            page_no += 1
+        
+        # 임시 파일에 쓴 뒤 교체하여 읽는 쪽이 깨진 파일을 보지 않도록 합니다.
+        tmp_path = self.catalog_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"synced_at": time.time(), "stores": stores}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.catalog_path)
+        # 실행 중인 워커는 파일 수정 시각이 바뀐 것을 보고 다음 검색 때 새 스냅샷을 불러옵니다.
+        return {"total_count": len(stores)}
+
+@contextmanager
+def file_lock(path):
+    """여러 워커가 같은 파일을 동시에 고치지 않도록 path.lock 잠금 파일을 잡습니다.
+    
+    fcntl이 없는 환경(Windows)에서는 잠그지 않습니다.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(path + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+class CacheWarmer:
+    """인기 검색어를 기록해 두었다가 시작할 때와 캐시가 만료되기 전에 미리 받아오는 예열기"""
+    
+    def __init__(self, api, path, top_n=20, pages=1, interval=None, seed_keywords=()):
+        self.api = api
+        self.path = path
+        self.top_n = top_n
+        self.pages = pages
+        # 검색 캐시 TTL보다 조금 일찍 갱신합니다.
+        self.interval = interval or max(30, int(api.cache.ttl * 0.8))
+        self.seed_keywords = tuple(seed_keywords)
+        self.counts = {keyword: 0 for keyword in self.seed_keywords}
+        # 메모리에 남겨 둘 검색어 수 (검색어마다 항목이 생기므로 top_n의 몇 배수만 둡니다)
+        self.max_tracked = top_n * 5
+        # 마지막 저장 이후 이 프로세스에서 늘어난 횟수 (저장할 때 파일의 횟수에 더합니다)
+        self.pending = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.load()
+    
+    def record(self, keyword):
+        """결과가 있었던 검색어의 횟수를 기록합니다."""
+        keyword = " ".join(str(keyword or "").split())
+        if keyword:
+            with self._lock:
+                self.counts[keyword] = self.counts.get(keyword, 0) + 1
+                self.pending[keyword] = self.pending.get(keyword, 0) + 1
+                # 저장 주기 사이(또는 예열을 끈 경우)에도 메모리가 계속 늘지 않도록 넘치면 줄입니다.
+                if len(self.counts) > self.max_tracked * 2:
+                    self._trim()
+    
+    def top_keywords(self):
+        with self._lock:
+            ranked = sorted(self.counts.items(), key=lambda item: -item[1])
+        return [keyword for keyword, _ in ranked[:self.top_n]]
+    
+    def _read_saved(self):
+        """파일에 저장된 검색어별 횟수를 반환합니다. 없거나 깨졌으면 빈 딕셔너리입니다."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                saved = json.load(f)
+            return {keyword: int(count) for keyword, count in saved.get("keywords", {}).items()}
+        except (OSError, ValueError, TypeError, AttributeError):
+            return {}
+    
+    def load(self):
+        """저장해 둔 인기 검색어를 불러옵니다."""
+        saved = self._read_saved()
+        with self._lock:
+            for keyword, count in saved.items():
+                self.counts[keyword] = max(self.counts.get(keyword, 0), count)
+    
+    def save(self):
+        """파일의 횟수에 이 프로세스에서 늘어난 횟수를 더해 상위 검색어를 저장합니다.
+        
+        워커마다 따로 세므로 덮어쓰지 않고 합칩니다. 읽기 전용 파일 시스템이면 건너뜁니다.
+        """
+        with self._lock:
+            pending, self.pending = self.pending, {}
+        try:
+            with file_lock(self.path):
+                merged = self._read_saved()
+                for keyword, count in pending.items():
+                    merged[keyword] = merged.get(keyword, 0) + count
+                top = dict(sorted(merged.items(), key=lambda item: -item[1])[:self.top_n])
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"saved_at": time.time(), "keywords": top}, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning("인기 검색어를 저장할 수 없습니다: %s", e)
+            # 저장하지 못한 횟수는 다음 저장 때 다시 더합니다.
+            with self._lock:
+                for keyword, count in pending.items():
+                    self.pending[keyword] = self.pending.get(keyword, 0) + count
+            return
+        
+        # 다른 워커가 저장한 횟수도 예열 대상 선정에 반영하고, 나머지 검색어는 상위 max_tracked개만 남깁니다.
+        with self._lock:
+            for keyword, count in top.items():
+                self.counts[keyword] = max(self.counts.get(keyword, 0), count)
+            self._trim()
+    
+    def _trim(self):
+        """횟수가 많은 max_tracked개와 시드 검색어만 남깁니다. (잠금을 잡은 상태에서 호출)"""
+        if len(self.counts) <= self.max_tracked:
+            return
+        kept = sorted(self.counts.items(), key=lambda item: -item[1])[:self.max_tracked]
+        self.counts = dict(kept)
+        for keyword in self.seed_keywords:
+            self.counts.setdefault(keyword, 0)
+        self.pending = {keyword: count for keyword, count in self.pending.items() if keyword in self.counts}
+    
+    def warm(self):
+        """상위 검색어의 앞 페이지들을 API에서 받아 캐시에 채웁니다."""
+        # 로컬 카탈로그로 검색하는 경우에는 API 캐시를 채울 필요가 없습니다.
+        if self.api.catalog is not None:
+            return
+        
+        keywords = self.top_keywords()
+        for keyword in keywords:
+            for page_no in range(1, self.pages + 1):
+                result = self.api.refresh_bookstores(keyword=keyword, page_no=page_no)
+                if "error" in result:
+                    break
+        logger.info("검색 캐시 예열 완료: %d개 검색어", len(keywords))
+    
+    def _run(self):
+        while True:
+            try:
+                self.warm()
+                self.save()
+            except Exception as e:
+                logger.exception("검색 캐시 예열 중 오류 발생: %s", e)
+            time.sleep(self.interval)
+    
+    def start(self):
+        """백그라운드 스레드에서 예열과 주기적 갱신을 시작합니다. 요청 처리는 기다리지 않습니다."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="cache-warmer", daemon=True)
+            self._thread.start()
 
-def format_bookstore_info(store):
+def format_bookstore_info(store, features=None, distance_km=None):
     """서점 정보를 보기 좋게 포맷팅합니다."""
     info = {}
     info["title"] = store.get('TITLE', '이름 없음')
@@ -125,8 +1732,377 @@ def format_bookstore_info(store):
     info["sub_description"] = store.get('SUB_DESCRIPTION', '')
     info["coordinates"] = store.get('COORDINATES', '')
     
+    # 순위 매기기 단계를 거친 경우에만 붙는 필드
+    if features is not None:
+        info["facets"] = list(features["facets"])
+    if distance_km is not None:
+        info["distance_km"] = round(distance_km, 2)
+    
     return info
 
+# SUB_DESCRIPTION에서 찾는 시설 정보: (있음 패턴, 없음 패턴)
+FACET_PATTERNS = {
+    "cafe": (re.compile(r"카페|커피|음료|cafe|coffee"), re.compile(r"(카페|커피|음료)\s*(없음|불가|미운영)")),
+    "parking": (re.compile(r"주차"), re.compile(r"주차\s*(장\s*)?(없음|불가|안\s*됨)")),
+    "wifi": (re.compile(r"와이파이|wi-?fi|무선\s*인터넷"), re.compile(r"(와이파이|wi-?fi|무선\s*인터넷)\s*(없음|불가|미제공)"))
+}
+
+# 검색어가 들어 있는 필드별 가중치와 시설/거리 가산점
+RANK_FIELD_WEIGHTS = (("title", 3.0), ("address", 2.0), ("description", 1.0))
+RANK_FACET_WEIGHTS = {"cafe": 1.0, "parking": 0.3, "wifi": 0.3}
+RANK_DISTANCE_WEIGHT = 2.0
+RANK_DISTANCE_SCALE_KM = 5.0
+
+def compact_text(text):
+    """정규화한 뒤 공백까지 없앤 비교용 문자열 ('책과 커피' == '책과커피')"""
+    return "".join(normalize_text(text).split())
+
+@lru_cache(maxsize=int(os.getenv("STORE_FEATURE_CACHE_SIZE", 10000)))
+def _store_features(title, address, description, sub_description, coordinates):
+    sub_description = str(sub_description or "").lower()
+    title, address = compact_text(title), compact_text(address)
+    return {
+        "title": title,
+        "address": address,
+        "description": compact_text(description),
+        "facets": tuple(
+            facet for facet, (present, absent) in FACET_PATTERNS.items()
+            if present.search(sub_description) and not absent.search(sub_description)
+        ),
+        "coordinates": parse_coordinates(coordinates),
+        "dedupe_key": (title, address)
+    }
+
+def store_features(store):
+    """검색어와 관계없는 서점별 특징(정규화한 필드, 시설, 좌표)을 계산합니다.
+    
+    같은 서점은 캐시된 결과를 재사용하므로 반환값을 수정하면 안 됩니다.
+    """
+    return _store_features(
+        store.get("TITLE"), store.get("ADDRESS"), store.get("DESCRIPTION"),
+        store.get("SUB_DESCRIPTION"), store.get("COORDINATES")
+    )
+
+def store_dedupe_key(store):
+    """정규화한 서점명과 주소로 중복 판별 키를 만듭니다."""
+    return store_features(store)["dedupe_key"]
+
+def great_circle_km(origin, coordinates):
+    """두 (위도, 경도) 사이의 대원 거리(km)"""
+    return chord_to_km(math.dist(to_unit_vector(*origin), to_unit_vector(*coordinates)))
+
+def parse_origin(values):
+    """요청 값에서 lat/lng를 읽어 (위도, 경도)를 반환합니다. 없거나 잘못되면 None을 반환합니다."""
+    try:
+        lat, lng = float(values["lat"]), float(values["lng"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if abs(lat) > 90 or abs(lng) > 180:
+        return None
+    return lat, lng
+
+def rank_stores(keyword, stores, origin=None):
+    """검색 결과를 관련도 순으로 정렬하고 서점명+주소가 같은 중복을 제거합니다.
+    
+    검색어가 서점명 > 주소 > 설명 순으로, 앞쪽에 나올수록 점수가 높고,
+    카페/주차/와이파이 시설과 (위치가 주어지면) 가까운 거리에 가산점을 줍니다.
+    (서점, 특징, 거리 km 또는 None) 목록을 반환합니다.
+    """
+    query_words = [compact_text(strip_admin_suffix(word)) for word in normalize_text(keyword).split()]
+    
+    scored = []
+    for position, store in enumerate(stores):
+        features = store_features(store)
+        score = 0.0
+        for word in query_words:
+            for field, weight in RANK_FIELD_WEIGHTS:
+                found_at = features[field].find(word)
+                if found_at >= 0:
+                    score += weight * (1 + 1 / (1 + found_at))
+        for facet in features["facets"]:
+            score += RANK_FACET_WEIGHTS[facet]
+        
+        distance = None
+        if origin is not None and features["coordinates"] is not None:
+            distance = great_circle_km(origin, features["coordinates"])
+            score += RANK_DISTANCE_WEIGHT / (1 + distance / RANK_DISTANCE_SCALE_KM)
+        scored.append((-score, position, store, features, distance))
+    
+    ranked = []
+    seen = set()
+    for _, _, store, features, distance in sorted(scored, key=lambda item: item[:2]):
+        if features["dedupe_key"] in seen:
+            continue
+        seen.add(features["dedupe_key"])
+        ranked.append((store, features, distance))
+    return ranked
+
+class JsonFileIndex:
+    """JSON 파일로 색인을 만들고, 파일이 바뀌면 새로 만든 색인으로 교체합니다."""
+    
+    def __init__(self, path, builder):
+        self.path = path
+        self.builder = builder
+        self._index = None
+        self._mtime = None
+        self._lock = threading.Lock()
+    
+    def get(self):
+        """현재 색인을 반환합니다. 파일 수정 시각이 바뀌었으면 다시 불러옵니다.
+        
+        파일이 없거나 쓰는 중이라 읽을 수 없으면 이전 색인을 그대로 쓰고, 다음 호출 때 다시 시도합니다.
+        이전 색인도 없으면 예외를 그대로 올립니다.
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime
+            if mtime != self._mtime:
+                with self._lock:
+                    if mtime != self._mtime:
+                        with open(self.path, encoding="utf-8") as f:
+                            data = json.load(f)
+                        # 새 색인을 다 만든 뒤 참조만 바꿔서 읽는 쪽은 항상 완성된 색인을 봅니다.
+                        self._index = self.builder(data)
+                        self._mtime = mtime
+        except (OSError, ValueError) as e:
+            if self._index is None:
+                raise
+            logger.warning("%s을(를) 다시 불러오지 못해 이전 색인을 사용합니다: %s", self.path, e)
+        return self._index
+
+class Book:
+    """도서 한 권의 정보"""
+    
+    __slots__ = (
+        "id", "title", "author", "category", "subcategory", "price", "description",
+        "publisher", "publication_date", "isbn", "stock", "location", "rating"
+    )
+    
+    def __init__(self, data):
+        for field in self.__slots__:
+            setattr(self, field, data.get(field))
+        self.price = int(self.price or 0)
+        self.stock = int(self.stock or 0)
+        self.rating = float(self.rating or 0)
+    
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+class BookCatalog:
+    """data/books.json 도서 목록에 대한 색인과 패싯 검색"""
+    
+    SORT_KEYS = ("relevance", "rating", "price", "price_desc")
+    
+    def __init__(self, data):
+        self.books = [Book(book) for book in data.get("books", [])]
+        self.by_isbn = {}
+        self.by_category = {}
+        self.by_subcategory = {}
+        self.by_author = {}
+        self.tokens = {}
+        for book_id, book in enumerate(self.books):
+            self.by_isbn[book.isbn] = book_id
+            self.by_category.setdefault(book.category, set()).add(book_id)
+            self.by_subcategory.setdefault(book.subcategory, set()).add(book_id)
+            self.by_author.setdefault(book.author, set()).add(book_id)
+            for weight, text in ((3, book.title), (1, book.description)):
+                for token in bigram_tokens(text):
+                    postings = self.tokens.setdefault(token, {})
+                    postings[book_id] = postings.get(book_id, 0) + weight
+        
+        # 가격 범위 검색과 정렬을 위한 정렬 색인
+        self.by_price = sorted(range(len(self.books)), key=lambda book_id: self.books[book_id].price)
+        self.prices = [self.books[book_id].price for book_id in self.by_price]
+        self.by_rating = sorted(range(len(self.books)), key=lambda book_id: -self.books[book_id].rating)
+    
+    def _match_tokens(self, query):
+        """검색어의 모든 바이그램을 포함하는 도서와 점수를 반환합니다."""
+        scores = None
+        for token in bigram_tokens(query):
+            posting = self.tokens.get(token, {})
+            if scores is None:
+                scores = dict(posting)
+            else:
+                scores = {book_id: score + posting[book_id] for book_id, score in scores.items() if book_id in posting}
+            if not scores:
+                return {}
+        return scores or {}
+    
+    def search(self, query=None, isbn=None, category=None, subcategory=None, author=None,
+               in_stock=False, min_price=None, max_price=None, min_rating=None,
+               sort="relevance", limit=20, offset=0):
+        """조건에 맞는 도서와 패싯 개수를 반환합니다."""
+        candidates = set(range(len(self.books)))
+        scores = {}
+        
+        if isbn:
+            candidates &= {self.by_isbn[isbn]} if isbn in self.by_isbn else set()
+        for value, index in ((category, self.by_category), (subcategory, self.by_subcategory), (author, self.by_author)):
+            if value:
+                candidates &= index.get(value, set())
+        if min_price is not None or max_price is not None:
+            start = bisect.bisect_left(self.prices, min_price) if min_price is not None else 0
+            end = bisect.bisect_right(self.prices, max_price) if max_price is not None else len(self.prices)
+            candidates &= set(self.by_price[start:end])
+        if query:
+            scores = self._match_tokens(query)
+            candidates &= scores.keys()
+        if in_stock:
+            candidates = {book_id for book_id in candidates if self.books[book_id].stock > 0}
+        if min_rating is not None:
+            candidates = {book_id for book_id in candidates if self.books[book_id].rating >= min_rating}
+        
+        # 미리 정렬된 색인 순서대로 후보를 골라 정렬 비용을 줄입니다.
+        if sort == "rating":
+            ordered = [book_id for book_id in self.by_rating if book_id in candidates]
+        elif sort == "price":
+            ordered = [book_id for book_id in self.by_price if book_id in candidates]
+        elif sort == "price_desc":
+            ordered = [book_id for book_id in reversed(self.by_price) if book_id in candidates]
+        else:
+            ordered = sorted(candidates, key=lambda book_id: (-scores.get(book_id, 0), book_id))
+        
+        facets = {"category": {}, "author": {}, "in_stock": {"true": 0, "false": 0}}
+        for book_id in candidates:
+            book = self.books[book_id]
+            facets["category"][book.category] = facets["category"].get(book.category, 0) + 1
+            facets["author"][book.author] = facets["author"].get(book.author, 0) + 1
+            facets["in_stock"]["true" if book.stock > 0 else "false"] += 1
+        
+        return {
+            "books": [self.books[book_id].to_dict() for book_id in ordered[offset:offset + limit]],
+            "total_count": len(ordered),
+            "facets": facets
+        }
+
+class CafeMenu:
+    """data/cafe_menu.json 메뉴에 대한 비트셋 색인
+    
+    알레르기 성분, 옵션(HOT/ICE), 분류, 시그니처, 판매 여부마다 메뉴 개수만큼의
+    비트를 가진 정수를 만들어 두고, 필터는 비트 연산으로 계산합니다.
+    """
+    
+    SECTIONS = ("drinks", "desserts")
+    
+    def __init__(self, data):
+        self.items = []
+        for section in self.SECTIONS:
+            for item in data.get(section, []):
+                self.items.append(dict(item, type=section, key=f"{section}-{item['id']}"))
+        
+        self.positions = {item["key"]: position for position, item in enumerate(self.items)}
+        self.all_mask = (1 << len(self.items)) - 1
+        self.allergens = {}
+        self.options = {}
+        self.categories = {}
+        self.types = {}
+        self.signature_mask = 0
+        self.available_mask = 0
+        for position, item in enumerate(self.items):
+            bit = 1 << position
+            for allergen in item.get("allergens", []):
+                self.allergens[allergen] = self.allergens.get(allergen, 0) | bit
+            for option in item.get("options", []):
+                self.options[option] = self.options.get(option, 0) | bit
+            self.categories[item.get("category")] = self.categories.get(item.get("category"), 0) | bit
+            self.types[item["type"]] = self.types.get(item["type"], 0) | bit
+            if item.get("is_signature"):
+                self.signature_mask |= bit
+            if item.get("is_available"):
+                self.available_mask |= bit
+        
+        # 칼로리 상한 필터: 칼로리 순으로 앞에서부터 누적한 비트셋
+        self.calorie_order = sorted(range(len(self.items)), key=lambda position: self.items[position].get("calories", 0))
+        self.calories = [self.items[position].get("calories", 0) for position in self.calorie_order]
+        self.calorie_prefix_masks = [0]
+        for position in self.calorie_order:
+            self.calorie_prefix_masks.append(self.calorie_prefix_masks[-1] | (1 << position))
+        self._lock = threading.Lock()
+    
+    def search(self, exclude_allergens=(), option=None, max_calories=None, category=None,
+               menu_type=None, signature_only=False, include_unavailable=False):
+        """조건에 맞는 메뉴 목록을 반환합니다."""
+        mask = self.all_mask if include_unavailable else self.available_mask
+        for allergen in exclude_allergens:
+            mask &= ~self.allergens.get(allergen, 0)
+        if option:
+            mask &= self.options.get(option.upper(), 0)
+        if category:
+            mask &= self.categories.get(category, 0)
+        if menu_type:
+            mask &= self.types.get(menu_type, 0)
+        if signature_only:
+            mask &= self.signature_mask
+        if max_calories is not None:
+            mask &= self.calorie_prefix_masks[bisect.bisect_right(self.calories, max_calories)]
+        
+        items = []
+        while mask:
+            lowest = mask & -mask
+            items.append(self.items[lowest.bit_length() - 1])
+            mask ^= lowest
+        return {"items": items, "total_count": len(items)}
+    
+    def set_available(self, key, is_available):
+        """메뉴 판매 여부를 색인을 다시 만들지 않고 바로 바꿉니다."""
+        position = self.positions.get(key)
+        if position is None:
+            return None
+        with self._lock:
+            bit = 1 << position
+            if is_available:
+                self.available_mask |= bit
+            else:
+                self.available_mask &= ~bit
+            self.items[position]["is_available"] = is_available
+        return self.items[position]
+
+class MenuAvailability:
+    """판매 여부 변경 내용을 메뉴 파일과 별도의 JSON 파일에 저장해 gunicorn 워커 간에 공유합니다."""
+    
+    def __init__(self, path):
+        self.path = path
+        self._overrides = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+    
+    def get(self):
+        """{메뉴 키: 판매 여부}를 반환합니다. 파일이 바뀌었으면 다시 불러옵니다."""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return self._overrides
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    with open(self.path, encoding="utf-8") as f:
+                        self._overrides = json.load(f)
+                    self._mtime = mtime
+        return self._overrides
+    
+    def set(self, key, is_available):
+        """변경 내용을 파일에 원자적으로 저장합니다. 다른 워커의 변경을 덮어쓰지 않도록 파일 잠금 안에서 읽고 씁니다."""
+        with self._lock, file_lock(self.path):
+            overrides = dict(self._overrides)
+            if os.path.exists(self.path):
+                with open(self.path, encoding="utf-8") as f:
+                    overrides = json.load(f)
+            overrides[key] = is_available
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(overrides, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+def current_menu():
+    """메뉴 색인에 다른 워커가 저장한 판매 여부 변경까지 반영해 반환합니다."""
+    index = cafe_menu.get()
+    overrides = menu_overrides.get()
+    # 메뉴 파일을 다시 불러왔거나 변경 내용이 바뀐 경우에만 다시 적용합니다.
+    if getattr(index, "applied_overrides", None) is not overrides:
+        for key, is_available in overrides.items():
+            index.set_available(key, is_available)
+        index.applied_overrides = overrides
+    return index
+
 def create_assistant():
     """AI 어시스턴트를 생성합니다."""
     # assistant = client.beta.assistants.create(
@@ -175,79 +2151,365 @@ def create_assistant():
 # API 클라이언트 초기화
 api = BookstoreAPI()
 
+# 지연 초기화를 끄면 (gunicorn --preload 등) 시작할 때 클라이언트를 미리 만듭니다.
+if not LAZY_INIT:
+    openai_client.get()
+    api.init_session()
+
+# 검색 캐시 예열 (인기 검색어를 시작할 때와 캐시 만료 전에 미리 받아옵니다)
+cache_warmer = CacheWarmer(
+    api,
+    os.getenv("WARMUP_KEYWORDS_PATH", "popular_keywords.json"),
+    top_n=int(os.getenv("WARMUP_TOP_N", 20)),
+    pages=int(os.getenv("WARMUP_PAGES", 1)),
+    interval=int(os.getenv("WARMUP_INTERVAL", 0)) or None,
+    seed_keywords=[keyword.strip() for keyword in os.getenv("WARMUP_KEYWORDS", "").split(",") if keyword.strip()]
+)
+if os.getenv("WARMUP_ENABLED", "true").lower() == "true":
+    cache_warmer.start()
+
+# AI 분석 캐시 초기화
+analysis_cache = create_analysis_cache()
+
+# 자동완성 색인 (검색 결과와 성공한 검색어가 쌓이며, 로컬 카탈로그가 있으면 처음 사용할 때 추가합니다)
+suggestions = SuggestionIndex(max_queries=int(os.getenv("SUGGEST_MAX_QUERIES", "1000")))
+_suggestions_catalog = None
+
+def suggest_candidates(query, k):
+    """자동완성 후보를 반환합니다. 로컬 카탈로그가 있으면 처음 호출할 때(다시 불러온 뒤에도) 전체 서점을 색인에 넣습니다."""
+    global _suggestions_catalog
+    catalog = api.catalog
+    if catalog is not None and catalog is not _suggestions_catalog:
+        _suggestions_catalog = catalog
+        suggestions.add_stores(catalog.stores)
+    return suggestions.suggest(query, k)
+
+# 도서 목록 색인 (처음 요청할 때 불러오고 파일이 바뀌면 다시 불러옵니다)
+book_catalog = JsonFileIndex(os.path.join("data", "books.json"), BookCatalog)
+
+# 카페 메뉴 색인
+cafe_menu = JsonFileIndex(os.path.join("data", "cafe_menu.json"), CafeMenu)
+menu_overrides = MenuAvailability(os.getenv("MENU_AVAILABILITY_PATH", "menu_availability.json"))
+
 # 어시스턴트 생성 (실제 배포 시에는 ID를 저장하고 재사용하는 것이 좋습니다)
 assistant_id = os.getenv("ASSISTANT_ID")
 if not assistant_id:
     # assistant = create_assistant()
     # assistant_id = assistant.id
     # print(f"새 어시스턴트 생성됨: {assistant_id}")
-    print("OpenAI 어시스턴트 기능 비활성화됨")
+    logger.info("OpenAI 어시스턴트 기능 비활성화됨")
 else:
-    print(f"기존 어시스턴트 사용: {assistant_id}")
+    logger.info("기존 어시스턴트 사용: %s", assistant_id)
 
 @app.route('/')
 def index():
     """메인 페이지"""
     return render_template('index.html')
 
-@app.route('/search', methods=['POST'])
+def rank_and_format(keyword, stores, origin=None):
+    """검색 결과를 관련도 순으로 정렬하고 중복을 제거한 뒤 포맷팅합니다."""
+    with stage_timer("rank"):
+        ranked = rank_stores(keyword, stores, origin)
+    
+    with stage_timer("format"):
+        return [format_bookstore_info(store, features, distance) for store, features, distance in ranked]
+
+@app.route('/search', methods=['GET', 'POST'])
 def search():
-    """서점 검색 API"""
-    keyword = request.form.get('keyword', '')
-    page = int(request.form.get('page', 1))
+    """서점 검색 API (GET은 ETag로 브라우저 캐시를 재검증할 수 있습니다)"""
+    keyword = request.values.get('keyword', '')
+    page = int(request.values.get('page', 1))
     
     if not keyword:
         return jsonify({"error": "검색어를 입력해주세요."})
     
     # 디버깅 메시지 추가
-    print(f"검색 요청: 키워드='{keyword}', 페이지={page}")
+    logger.debug("검색 요청: 키워드='%s', 페이지=%d", keyword, page)
     
     # 테스트용 더미 데이터 설정 (기본값: false)
     use_dummy_data = os.getenv("USE_DUMMY_DATA", "false").lower() == "true"
     
     # 실제 API 호출 (더미 데이터 모드가 아닌 경우)
     if not use_dummy_data:
-        print("실제 API 호출 중...")
         result = api.search_bookstores(keyword=keyword, page_no=page)
         
         # API 호출 성공 시 실제 데이터 반환
         if "error" not in result:
-            # 검색 결과 포맷팅
-            formatted_stores = []
-            for store in result["stores"]:
-                formatted_stores.append(format_bookstore_info(store))
+            # 관련도 순 정렬, 중복 제거, 포맷팅 (lat/lng가 있으면 가까운 서점에 가산점)
+            formatted_stores = rank_and_format(keyword, result["stores"], parse_origin(request.values))
             
-            print(f"API 검색 결과: {len(formatted_stores)}개 항목 찾음")
+            logger.debug("API 검색 결과: %d개 항목 찾음", len(formatted_stores))
             
-            # AI 분석 활성화
-            ai_analysis = get_ai_analysis(keyword, formatted_stores)
+            # 결과가 있는 검색어와 서점명/지역명을 자동완성 후보로 기록
+            suggestions.add(keyword, "query")
+            suggestions.add_stores(result["stores"])
+            cache_warmer.record(keyword)
             
-            return jsonify({
+            # 결과가 같으면 AI 분석을 하지 않고 304로 응답합니다.
+            results = {
                 "stores": formatted_stores,
                 "total_count": result["total_count"],
-                "ai_analysis": ai_analysis,
-                "data_source": "real_api"
-            })
+                "data_source": result.get("data_source", "real_api")
+            }
+            etag = results_etag(results)
+            cached_response = not_modified(etag)
+            if cached_response is not None:
+                return cached_response
+            
+            # 비동기 모드에서는 분석 작업 ID만 반환하고 결과는 /analysis/<id>에서 받습니다.
+            if os.getenv("AI_ANALYSIS_MODE", "sync").lower() == "async":
+                return with_etag(jsonify(dict(
+                    results,
+                    ai_analysis=None,
+                    analysis_id=analysis_jobs.submit(keyword, formatted_stores)
+                )), etag)
+            
+            # AI 분석 활성화
+            ai_analysis = get_ai_analysis(keyword, formatted_stores)
+            
+            return with_etag(jsonify(dict(results, ai_analysis=ai_analysis)), etag)
         else:
-            print(f"API 오류: {result['error']}")
+            logger.info("API 오류: %s", result["error"])
             # API 오류 시 오류 메시지 반환 (더미 데이터로 폴백하지 않음)
             return jsonify({
                 "error": result["error"],
                 "suggestion": get_search_suggestion()
             })
     else:
-        print("더미 데이터 모드 활성화됨")
+        logger.debug("더미 데이터 모드 활성화됨")
         # 더미 데이터 모드가 활성화된 경우 안내 메시지 반환
+        return jsonify(get_test_mode_response())
+
+# 일괄 검색에서 한 번에 보낼 수 있는 최대 검색 수
+MAX_BATCH_QUERIES = 50
+
+batch_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("BATCH_SEARCH_CONCURRENCY", 8)),
+    thread_name_prefix="batch-search"
+)
+
+@app.route('/search/batch', methods=['POST'])
+def search_batch():
+    """여러 키워드/페이지를 동시에 검색하고 중복을 제거해 합친 결과를 반환하는 API
+    
+    JSON 본문 예시: {"keywords": ["강남", "홍대"], "pages": [1, 2]}
+    또는 {"keywords": [...], "page_start": 1, "page_end": 3}
+    """
+    data = request.get_json(silent=True) or request.form
+    if not hasattr(data, "get"):
+        return jsonify({"error": "요청 본문은 JSON 객체여야 합니다."})
+    keywords = data.get("keywords") or []
+    if isinstance(keywords, str):
+        keywords = keywords.split(",")
+    if not isinstance(keywords, list) or not all(isinstance(keyword, str) for keyword in keywords):
+        return jsonify({"error": "검색어는 문자열 목록으로 입력해주세요."})
+    keywords = [keyword.strip() for keyword in keywords if keyword.strip()]
+    
+    too_many_error = {"error": f"한 번에 최대 {MAX_BATCH_QUERIES}건까지 검색할 수 있습니다."}
+    try:
+        if data.get("pages"):
+            pages = data.get("pages")
+            # 폼 전송이면 keywords와 마찬가지로 쉼표로 나눕니다.
+            if isinstance(pages, str):
+                pages = pages.split(",")
+            if len(pages) > MAX_BATCH_QUERIES:
+                return jsonify(too_many_error)
+            pages = [int(page) for page in pages]
+        else:
+            page_start = int(data.get("page_start", 1))
+            page_end = int(data.get("page_end", page_start))
+            # 목록을 만들기 전에 범위 크기부터 확인합니다.
+            if page_end - page_start + 1 > MAX_BATCH_QUERIES:
+                return jsonify(too_many_error)
+            pages = list(range(page_start, page_end + 1))
+    except (TypeError, ValueError):
+        return jsonify({"error": "페이지는 숫자로 입력해주세요."})
+    
+    if not keywords:
+        return jsonify({"error": "검색어를 입력해주세요."})
+    
+    queries = [(keyword, page) for keyword in dict.fromkeys(keywords) for page in dict.fromkeys(pages) if page >= 1]
+    if not queries:
+        return jsonify({"error": "페이지는 1 이상이어야 합니다."})
+    if len(queries) > MAX_BATCH_QUERIES:
+        return jsonify(too_many_error)
+    
+    results = batch_executor.map(
+        lambda query: api.search_bookstores(keyword=query[0], page_no=query[1]),
+        queries
+    )
+    
+    formatted_stores = []
+    seen = set()
+    query_results = []
+    for (keyword, page), result in zip(queries, results):
+        if "error" in result:
+            query_results.append({"keyword": keyword, "page": page, "error": result["error"]})
+            continue
+        
+        query_results.append({"keyword": keyword, "page": page, "total_count": result["total_count"]})
+        for store in result["stores"]:
+            key = store_dedupe_key(store)
+            if key in seen:
+                continue
+            seen.add(key)
+            formatted_stores.append(format_bookstore_info(store))
+    
+    if not formatted_stores:
         return jsonify({
-            "error": "현재 테스트 모드가 활성화되어 있습니다. 실시간 데이터를 보려면 관리자에게 문의하세요.",
-            "suggestion": {
-                "message": "실시간 API 데이터를 사용하려면 환경 설정을 변경해야 합니다.",
-                "examples": [
-                    "USE_DUMMY_DATA=false 설정 필요",
-                    "관리자에게 문의하세요."
-                ]
-            }
+            "error": "검색 결과가 없습니다.",
+            "queries": query_results,
+            "suggestion": get_search_suggestion()
         })
+    
+    return jsonify({
+        "stores": formatted_stores,
+        "total_count": len(formatted_stores),
+        "queries": query_results
+    })
+
+# 내보내기 CSV 열 순서 (format_bookstore_info 필드 + 페이지 번호)
+EXPORT_FIELDS = ("page", "title", "address", "contact", "description", "sub_description", "coordinates")
+
+def iter_export_pages(first_result, keyword, page_no, page_size):
+    """API 전체 페이지를 차례로 반환합니다. 현재 페이지를 내보내는 동안 다음 페이지를 미리 받아옵니다."""
+    fetch = lambda page: api._fetch_bookstores(keyword, page, page_size, xml_parser="iterparse")
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="export-prefetch") as prefetcher:
+        result = first_result
+        while True:
+            total_pages = math.ceil(result["total_count"] / page_size)
+            next_page = prefetcher.submit(fetch, page_no + 1) if page_no < total_pages else None
+            yield page_no, result["stores"]
+            
+            if next_page is None:
+                return
+            result = next_page.result()
+            page_no += 1
+            if "error" in result:
+                logger.warning("내보내기 중단 (페이지 %d): %s", page_no, result["error"])
+                yield page_no, {"error": result["error"]}
+                return
+
+def export_ndjson(pages):
+    for page_no, stores in pages:
+        if isinstance(stores, dict):
+            yield json.dumps({"page": page_no, **stores}, ensure_ascii=False) + "\n"
+            return
+        for store in stores:
+            yield json.dumps({"page": page_no, **format_bookstore_info(store)}, ensure_ascii=False) + "\n"
+
+def export_csv(pages):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    # 엑셀에서 한글이 깨지지 않도록 BOM을 붙입니다.
+    buffer.write("\ufeff")
+    writer.writeheader()
+    for page_no, stores in pages:
+        if isinstance(stores, dict):
+            # 잘린 파일이 완전한 것처럼 보이지 않도록 실패한 페이지와 이어받을 cursor를 마지막 행에 남깁니다.
+            writer.writerow({
+                "page": page_no,
+                "title": f"ERROR: 내보내기 중단 ({stores['error']}) cursor={page_no}로 이어받으세요."
+            })
+            yield buffer.getvalue()
+            return
+        for store in stores:
+            writer.writerow({"page": page_no, **format_bookstore_info(store)})
+        # 페이지 단위로 내보내고 버퍼를 비워 메모리 사용량을 일정하게 유지
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+@app.route('/export')
+def export():
+    """전체 서점 목록 내보내기 API (NDJSON/CSV 스트리밍)
+    
+    cursor로 시작 페이지를 지정하여 끊긴 지점부터 이어받을 수 있습니다.
+    """
+    export_format = request.args.get("format", "ndjson").lower()
+    if export_format not in ("ndjson", "csv"):
+        return jsonify({"error": "format은 ndjson 또는 csv여야 합니다."})
+    
+    try:
+        page_no = max(int(request.args.get("cursor", 1)), 1)
+        # 너무 작으면 한 번 내보내는 데 API 호출이 지나치게 많아집니다.
+        page_size = min(max(int(request.args.get("page_size", 100)), 100), 1000)
+    except ValueError:
+        return jsonify({"error": "cursor와 page_size는 숫자로 입력해주세요."})
+    keyword = request.args.get("keyword") or None
+    
+    # 첫 페이지는 미리 받아 오류를 일반 JSON 응답으로 돌려줍니다.
+    first_result = api._fetch_bookstores(keyword, page_no, page_size, xml_parser="iterparse")
+    if "error" in first_result:
+        return jsonify({"error": first_result["error"]})
+    
+    pages = iter_export_pages(first_result, keyword, page_no, page_size)
+    if export_format == "csv":
+        body, mimetype, extension = export_csv(pages), "text/csv; charset=utf-8", "csv"
+    else:
+        body, mimetype, extension = export_ndjson(pages), "application/x-ndjson; charset=utf-8", "ndjson"
+    
+    return Response(body, mimetype=mimetype, headers={
+        "Content-Disposition": f"attachment; filename=bookstores.{extension}",
+        "X-Total-Count": str(first_result["total_count"])
+    })
+
+@app.route('/suggest')
+def suggest():
+    """검색어 자동완성 API"""
+    try:
+        k = min(int(request.args.get("k", 10)), 20)
+    except ValueError:
+        k = 10
+    return jsonify({"suggestions": suggest_candidates(request.args.get("q", ""), k)})
+
+@app.route('/nearby')
+def nearby():
+    """내 위치 주변 서점 검색 API"""
+    try:
+        lat = float(request.args["lat"])
+        lng = float(request.args["lng"])
+        k = min(max(int(request.args.get("k", 10)), 1), 50)
+        radius = request.args.get("radius")
+        radius_km = float(radius) if radius else None
+    except (KeyError, ValueError):
+        return jsonify({"error": "위도(lat)와 경도(lng)를 숫자로 입력해주세요."})
+    
+    if not (abs(lat) <= 90 and abs(lng) <= 180):
+        return jsonify({"error": "위도(lat)는 -90~90, 경도(lng)는 -180~180 사이로 입력해주세요."})
+    if radius_km is not None and not radius_km >= 0:
+        return jsonify({"error": "반경(radius)은 0 이상으로 입력해주세요."})
+    
+    if api.catalog is None:
+        return jsonify({"error": "주변 서점 검색을 위한 로컬 카탈로그가 없습니다. sync_catalog.py를 먼저 실행해주세요."})
+    
+    formatted_stores = []
+    for store, distance in api.catalog.nearby(lat, lng, k=k, radius_km=radius_km):
+        info = format_bookstore_info(store)
+        info["distance_km"] = distance
+        formatted_stores.append(info)
+    
+    if not formatted_stores:
+        return jsonify({"error": "주변에 검색된 서점이 없습니다. 반경을 넓혀 다시 시도해보세요."})
+    
+    return jsonify({
+        "stores": formatted_stores,
+        "total_count": len(formatted_stores),
+        "data_source": "local_catalog"
+    })
+
+def get_test_mode_response():
+    """더미 데이터 모드에서 검색 요청에 돌려줄 안내 메시지를 반환합니다."""
+    return {
+        "error": "현재 테스트 모드가 활성화되어 있습니다. 실시간 데이터를 보려면 관리자에게 문의하세요.",
+        "suggestion": {
+            "message": "실시간 API 데이터를 사용하려면 환경 설정을 변경해야 합니다.",
+            "examples": [
+                "USE_DUMMY_DATA=false 설정 필요",
+                "관리자에게 문의하세요."
+            ]
+        }
+    }
 
 def get_search_suggestion():
     """검색 제안을 반환합니다."""
@@ -449,47 +2711,300 @@ def get_dummy_data(keyword):
         "ai_analysis": f"'{keyword}'에 대한 검색 결과입니다. 더미 데이터를 사용하고 있습니다."
     }
 
+OPENAI_UNAVAILABLE_MESSAGE = "OpenAI API 연결에 문제가 있어 AI 분석을 제공할 수 없습니다."
+AI_BUSY_MESSAGE = "요청이 많아 지금은 AI 분석을 제공할 수 없습니다. 검색 결과는 그대로 이용하실 수 있습니다."
+
+# 동시 AI 분석 호출 수 제한 (넘치면 기다리지 않고 AI 분석 없이 응답합니다)
+ai_limiter = ConcurrencyLimiter(
+    int(os.getenv("AI_MAX_CONCURRENCY", 4)),
+    wait_timeout=float(os.getenv("AI_QUEUE_TIMEOUT", 0.5))
+)
+
+def ai_analysis_unavailable_message(keyword, stores):
+    """AI 분석을 요청할 수 없는 경우 사용자에게 보여줄 메시지를, 요청할 수 있으면 None을 반환합니다."""
+    # OpenAI API 키가 설정되어 있지 않으면 기본 메시지 반환
+    if not os.getenv("OPENAI_API_KEY") or os.getenv("OPENAI_API_KEY") == "your_openai_api_key_here":
+        return "AI 분석을 위해 OpenAI API 키가 필요합니다."
+    
+    # 검색 결과가 없으면 기본 메시지 반환
+    if not stores:
+        return f"'{keyword}'에 대한 검색 결과가 없습니다. 다른 키워드로 검색해보세요."
+    return None
+
+def build_ai_analysis_request(keyword, stores):
+    """chat.completions.create에 넘길 요청 인자를 만듭니다."""
+    # 서점 정보 텍스트 생성
+    store_info = "\n".join([
+        f"서점명: {store['title']}\n"
+        f"주소: {store['address']}\n"
+        f"설명: {store['description']}\n"
+        for store in stores[:3]  # 최대 3개까지만 분석
+    ])
+    
+    return {
+        "model": "gpt-3.5-turbo",
+        "messages": [
+            {"role": "system", "content": "당신은 서점 추천 전문가입니다. 사용자에게 친근하고 유용한 정보를 제공해주세요."},
+            {"role": "user", "content": f"다음은 '{keyword}' 검색 결과로 나온 서점 목록입니다. 이 서점들의 특징을 분석하고, 어떤 사람들에게 추천할 만한지, 방문 시 팁이나 주변 정보도 알려주세요.\n\n{store_info}"}
+        ],
+        "max_tokens": 300,
+        "temperature": 0.7
+    }
+
+def record_ai_analysis(cache_key, response, started_at):
+    """OpenAI 응답에서 분석 결과를 꺼내고 토큰 사용량 기록 및 캐시 저장을 합니다."""
+    ai_analysis = response.choices[0].message.content
+    tokens = response.usage.total_tokens if response.usage else 0
+    if response.usage:
+        OPENAI_TOKENS.inc("prompt", amount=response.usage.prompt_tokens)
+        OPENAI_TOKENS.inc("completion", amount=response.usage.completion_tokens)
+    analysis_cache.set(cache_key, ai_analysis, tokens, (time.perf_counter() - started_at) * 1000)
+    return ai_analysis
+
 def get_ai_analysis(keyword, stores):
     """AI 분석을 요청합니다."""
     try:
-        # OpenAI 사용 불가능한 경우
-        if not openai_available:
-            return "OpenAI API 연결에 문제가 있어 AI 분석을 제공할 수 없습니다."
-        
-        # OpenAI API 키가 설정되어 있지 않으면 기본 메시지 반환
-        if not os.getenv("OPENAI_API_KEY") or os.getenv("OPENAI_API_KEY") == "your_openai_api_key_here":
-            return "AI 분석을 위해 OpenAI API 키가 필요합니다."
-        
-        # 검색 결과가 없으면 기본 메시지 반환
-        if not stores:
-            return f"'{keyword}'에 대한 검색 결과가 없습니다. 다른 키워드로 검색해보세요."
-        
-        # 서점 정보 텍스트 생성
-        store_info = "\n".join([
-            f"서점명: {store['title']}\n"
-            f"주소: {store['address']}\n"
-            f"설명: {store['description']}\n"
-            for store in stores[:3]  # 최대 3개까지만 분석
-        ])
+        message = ai_analysis_unavailable_message(keyword, stores)
+        if message:
+            return message
+        
+        # 같은 키워드와 같은 상위 서점에 대한 분석은 캐시에서 반환
+        cache_key = analysis_cache.fingerprint(keyword, stores)
+        cached_analysis = analysis_cache.get(cache_key)
+        if cached_analysis is not None:
+            return cached_analysis
+        
+        # 캐시에 없을 때만 클라이언트를 만듭니다.
+        client = openai_client.get()
+        if client is None:
+            return OPENAI_UNAVAILABLE_MESSAGE
         
         # AI 분석 요청
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "당신은 서점 추천 전문가입니다. 사용자에게 친근하고 유용한 정보를 제공해주세요."},
-                {"role": "user", "content": f"다음은 '{keyword}' 검색 결과로 나온 서점 목록입니다. 이 서점들의 특징을 분석하고, 어떤 사람들에게 추천할 만한지, 방문 시 팁이나 주변 정보도 알려주세요.\n\n{store_info}"}
-            ],
-            max_tokens=300,
-            temperature=0.7
-        )
+        with ai_limiter.slot() as acquired:
+            if not acquired:
+                SHED_REQUESTS.inc("ai")
+                return AI_BUSY_MESSAGE
+            started_at = time.perf_counter()
+            with stage_timer("ai"):
+                response = client.chat.completions.create(**build_ai_analysis_request(keyword, stores))
         
         # 응답 반환
-        return response.choices[0].message.content
+        return record_ai_analysis(cache_key, response, started_at)
         
     except Exception as e:
-        print(f"AI 분석 중 오류 발생: {str(e)}")
+        logger.warning("AI 분석 중 오류 발생: %s", e)
         return f"AI 분석 중 오류가 발생했습니다: {str(e)}"
 
+class AnalysisJobQueue:
+    """get_ai_analysis를 백그라운드 스레드에서 실행하고 결과를 보관하는 작업 큐"""
+    
+    def __init__(self, max_workers=4, max_jobs=256):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ai-analysis")
+        self.max_jobs = max_jobs
+        self.jobs = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def submit(self, keyword, stores):
+        """분석 작업을 등록하고 작업 ID를 반환합니다.
+        
+        작업 ID는 분석 캐시 키와 같으므로 다른 워커도 (공유) 분석 캐시에서 결과를 찾을 수 있습니다.
+        같은 분석이 진행 중이거나 이미 캐시되어 있으면 새 작업을 만들지 않습니다.
+        """
+        job_id = analysis_cache.fingerprint(keyword, stores)
+        with self._lock:
+            if job_id in self.jobs:
+                return job_id
+        # 캐시에 없으면 작업 안의 get_ai_analysis가 미스를 세므로 여기서는 세지 않습니다.
+        if analysis_cache.get(job_id, count_miss=False) is not None:
+            return job_id
+        
+        future = self.executor.submit(get_ai_analysis, keyword, stores)
+        with self._lock:
+            self.jobs[job_id] = future
+            # 오래된 작업부터 정리
+            while len(self.jobs) > self.max_jobs:
+                self.jobs.popitem(last=False)
+        return job_id
+    
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+analysis_jobs = AnalysisJobQueue(max_workers=int(os.getenv("AI_ANALYSIS_WORKERS", 4)))
+
+@app.route('/analysis/<job_id>')
+def analysis_result(job_id):
+    """AI 분석 작업 결과 조회 API (기다리지 않고 바로 응답합니다)
+    
+    작업이 이 프로세스에 없으면 (다른 워커나 서버리스 인스턴스에서 만든 경우) 분석 캐시를 확인하고,
+    그래도 없으면 keyword/page 쿼리로 검색을 다시 해서 같은 작업 ID가 나올 때만 이 워커에 작업을 등록합니다.
+    """
+    future = analysis_jobs.get(job_id)
+    if future is not None:
+        if not future.done():
+            return jsonify({"status": "pending"})
+        return jsonify({"status": "done", "ai_analysis": future.result()})
+    
+    cached_analysis = analysis_cache.peek(job_id)
+    if cached_analysis is not None:
+        return jsonify({"status": "done", "ai_analysis": cached_analysis})
+    
+    keyword = request.args.get("keyword", "")
+    if not keyword:
+        return jsonify({"error": "분석 작업을 찾을 수 없습니다."}), 404
+    try:
+        page = int(request.args.get("page", 1))
+    except ValueError:
+        return jsonify({"error": "페이지는 숫자로 입력해주세요."})
+    
+    result = api.search_bookstores(keyword=keyword, page_no=page)
+    if "error" in result:
+        return jsonify({"error": result["error"]})
+    stores = rank_and_format(keyword, result["stores"], parse_origin(request.args))
+    # 아무 키워드로나 분석을 돌리지 못하도록 원래 작업과 같은 검색 결과일 때만 다시 등록합니다.
+    if analysis_cache.fingerprint(keyword, stores) != job_id:
+        return jsonify({"error": "분석 작업을 찾을 수 없습니다."}), 404
+    analysis_jobs.submit(keyword, stores)
+    return jsonify({"status": "pending"})
+
+@app.route('/analysis/<job_id>/stream')
+def analysis_stream(job_id):
+    """AI 분석 결과를 Server-Sent Events로 전달하는 API
+    
+    결과가 나올 때까지 연결을 유지하므로 동기 워커에서는 그동안 워커 하나를 점유합니다.
+    웹 화면은 /analysis/<id>를 폴링합니다.
+    """
+    future = analysis_jobs.get(job_id)
+    if future is None:
+        return jsonify({"error": "분석 작업을 찾을 수 없습니다."}), 404
+    
+    def generate():
+        # 연결이 끊기지 않도록 결과가 나올 때까지 주기적으로 keep-alive를 보냅니다.
+        for _ in range(12):
+            try:
+                ai_analysis = future.result(timeout=5)
+                break
+            except FutureTimeoutError:
+                yield ": keep-alive\n\n"
+        else:
+            ai_analysis = "AI 분석 시간이 초과되었습니다. 잠시 후 다시 시도해주세요."
+        payload = json.dumps({"status": "done", "ai_analysis": ai_analysis}, ensure_ascii=False)
+        yield f"event: analysis\ndata: {payload}\n\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/books')
+def books():
+    """매장 도서 검색 API"""
+    args = request.args
+    try:
+        min_price = int(args["min_price"]) if args.get("min_price") else None
+        max_price = int(args["max_price"]) if args.get("max_price") else None
+        min_rating = float(args["min_rating"]) if args.get("min_rating") else None
+        limit = min(max(int(args.get("limit", 20)), 1), 100)
+        offset = max(int(args.get("offset", 0)), 0)
+    except ValueError:
+        return jsonify({"error": "가격, 평점, limit, offset은 숫자로 입력해주세요."})
+    
+    sort = args.get("sort", "relevance")
+    if sort not in BookCatalog.SORT_KEYS:
+        return jsonify({"error": f"정렬 기준은 {', '.join(BookCatalog.SORT_KEYS)} 중 하나여야 합니다."})
+    
+    return jsonify(book_catalog.get().search(
+        query=args.get("q"),
+        isbn=args.get("isbn"),
+        category=args.get("category"),
+        subcategory=args.get("subcategory"),
+        author=args.get("author"),
+        in_stock=args.get("in_stock", "false").lower() == "true",
+        min_price=min_price,
+        max_price=max_price,
+        min_rating=min_rating,
+        sort=sort,
+        limit=limit,
+        offset=offset
+    ))
+
+@app.route('/menu')
+def menu():
+    """카페 메뉴 검색 API"""
+    args = request.args
+    try:
+        max_calories = int(args["max_calories"]) if args.get("max_calories") else None
+    except ValueError:
+        return jsonify({"error": "칼로리는 숫자로 입력해주세요."})
+    
+    exclude_allergens = [allergen.strip() for allergen in args.get("exclude_allergens", "").split(",") if allergen.strip()]
+    return jsonify(current_menu().search(
+        exclude_allergens=exclude_allergens,
+        option=args.get("option"),
+        max_calories=max_calories,
+        category=args.get("category"),
+        menu_type=args.get("type"),
+        signature_only=args.get("signature", "false").lower() == "true",
+        include_unavailable=args.get("include_unavailable", "false").lower() == "true"
+    ))
+
+@app.route('/menu/<item_key>/availability', methods=['POST'])
+def menu_availability(item_key):
+    """메뉴 판매 여부 변경 API (X-Admin-Token 헤더가 MENU_ADMIN_TOKEN과 일치해야 합니다)"""
+    # 토큰이 설정되지 않았으면 아무도 바꿀 수 없습니다.
+    admin_token = os.getenv("MENU_ADMIN_TOKEN")
+    if not admin_token or request.headers.get("X-Admin-Token") != admin_token:
+        return jsonify({"error": "권한이 없습니다."}), 403
+    
+    index = current_menu()
+    if item_key not in index.positions:
+        return jsonify({"error": "메뉴를 찾을 수 없습니다."}), 404
+    
+    # 파일에 저장해야 다른 워커와 메뉴 파일을 다시 불러온 뒤에도 유지됩니다.
+    is_available = request.form.get("is_available", "true").lower() == "true"
+    try:
+        menu_overrides.set(item_key, is_available)
+    except OSError as e:
+        logger.warning("메뉴 판매 여부를 저장할 수 없습니다: %s", e)
+        return jsonify({"error": "판매 여부 변경 내용을 저장할 수 없습니다."}), 500
+    return jsonify(index.set_available(item_key, is_available))
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus 형식의 지표 API"""
+    lines = []
+    for metric in (STAGE_DURATION, REQUEST_DURATION, UPSTREAM_ERRORS, OPENAI_TOKENS, RATE_LIMITED, SHED_REQUESTS):
+        lines.extend(metric.render())
+    
+    # 캐시 통계는 조회 시점에 계산
+    lines += [
+        "# TYPE bookstore_cache_hits_total counter",
+        "# TYPE bookstore_cache_misses_total counter",
+        "# TYPE bookstore_cache_hit_ratio gauge",
+        "# TYPE bookstore_cache_entries gauge",
+        "# TYPE bookstore_upstream_circuit_open gauge",
+        "# TYPE bookstore_in_flight gauge"
+    ]
+    for cache_name, stats in (("search", api.cache.get_stats()), ("analysis", analysis_cache.get_stats())):
+        lines.append(f'bookstore_cache_hits_total{{cache="{cache_name}"}} {stats["hits"] + stats.get("stale_hits", 0)}')
+        lines.append(f'bookstore_cache_misses_total{{cache="{cache_name}"}} {stats["misses"]}')
+        lines.append(f'bookstore_cache_hit_ratio{{cache="{cache_name}"}} {stats["hit_ratio"]}')
+        lines.append(f'bookstore_cache_entries{{cache="{cache_name}"}} {stats["entries"]}')
+    lines.append(f'bookstore_upstream_circuit_open {int(api.breaker.state == "open")}')
+    lines.append(f'bookstore_in_flight{{target="upstream"}} {api.upstream_limiter.in_flight}')
+    lines.append(f'bookstore_in_flight{{target="ai"}} {ai_limiter.in_flight}')
+    
+    return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+@app.route('/cache/stats')
+def cache_stats():
+    """검색/AI 분석 캐시 통계 API"""
+    return jsonify({
+        "search": api.cache.get_stats(),
+        "analysis": analysis_cache.get_stats()
+    })
+
 @app.route('/exit')
 def exit_app():
     """앱 종료 (웹 애플리케이션에서는 로그아웃 또는 홈으로 리디렉션)"""
@@ -497,6 +3012,10 @@ def exit_app():
     return redirect(url_for('index'))
 
 if __name__ == "__main__":
+    # 개발 서버 콘솔 색상 (Windows)
+    from colorama import init
+    init()
+    
     # 템플릿 디렉토리 생성
     os.makedirs('templates', exist_ok=True)
     
@@ -10,6 +10,33 @@ document.addEventListener('DOMContentLoaded', function() {
     const resultCount = document.getElementById('resultCount');
     const resultsList = document.getElementById('resultsList');
     const aiAnalysis = document.getElementById('aiAnalysis');
+    const keywordSuggestions = document.getElementById('keywordSuggestions');
+    let suggestTimer = null;
+
+    // 검색어 자동완성 (입력이 멈추면 요청)
+    keywordInput.addEventListener('input', function() {
+        clearTimeout(suggestTimer);
+        const query = keywordInput.value.trim();
+        
+        if (!query) {
+            keywordSuggestions.innerHTML = '';
+            return;
+        }
+        
+        suggestTimer = setTimeout(function() {
+            fetch(`/suggest?q=${encodeURIComponent(query)}`)
+                .then(response => response.json())
+                .then(data => {
+                    keywordSuggestions.innerHTML = '';
+                    data.suggestions.forEach(suggestion => {
+                        const option = document.createElement('option');
+                        option.value = suggestion.text;
+                        keywordSuggestions.appendChild(option);
+                    });
+                })
+                .catch(error => console.error('Error:', error));
+        }, 150);
+    });
 
     // 검색 폼 제출 이벤트 처리
     searchForm.addEventListener('submit', function(e) {
@@ -31,16 +58,13 @@ document.addEventListener('DOMContentLoaded', function() {
         hideError();
         hideResults();
         
-        // FormData 생성
-        const formData = new FormData();
-        formData.append('keyword', keyword);
-        formData.append('page', 1);
+        // 검색 파라미터 생성
+        const params = new URLSearchParams();
+        params.append('keyword', keyword);
+        params.append('page', 1);
         
-        // 서버에 검색 요청
-        fetch('/search', {
-            method: 'POST',
-            body: formData
-        })
+        // 서버에 검색 요청 (GET이라 결과가 같으면 브라우저가 304로 재사용합니다)
+        fetch(`/search?${params}`)
         .then(response => response.json())
         .then(data => {
             showLoading(false);
@@ -110,6 +134,8 @@ document.addEventListener('DOMContentLoaded', function() {
         
         if (data.data_source === 'real_api') {
             dataSourceBadge.innerHTML = '<span class="badge bg-success">실시간 API 데이터</span>';
+        } else if (data.data_source === 'local_catalog') {
+            dataSourceBadge.innerHTML = '<span class="badge bg-info text-dark">로컬 카탈로그 데이터</span>';
         } else {
             dataSourceBadge.innerHTML = '<span class="badge bg-warning text-dark">테스트용 더미 데이터</span>';
         }
@@ -122,13 +148,58 @@ document.addEventListener('DOMContentLoaded', function() {
             resultsList.appendChild(storeCard);
         });
         
-        // AI 분석 표시
-        aiAnalysis.textContent = data.ai_analysis || '분석 정보가 없습니다.';
+        // AI 분석 표시 (비동기 모드에서는 분석이 끝나면 채워집니다)
+        if (data.analysis_id) {
+            aiAnalysis.textContent = 'AI 분석 중입니다...';
+            loadAnalysis(data.analysis_id, keywordInput.value.trim());
+        } else {
+            aiAnalysis.textContent = data.ai_analysis || '분석 정보가 없습니다.';
+        }
         
         // 결과 컨테이너 표시
         resultsContainer.classList.remove('d-none');
     }
 
+    // 비동기 AI 분석 결과 수신 함수
+    // 결과 조회 API는 기다리지 않고 바로 응답하므로 간격을 늘려가며 폴링합니다.
+    // keyword는 다른 워커에서 작업을 찾지 못할 때 서버가 분석을 다시 하는 데 사용합니다.
+    let currentAnalysisId = null;
+    
+    function loadAnalysis(analysisId, keyword) {
+        currentAnalysisId = analysisId;
+        const params = new URLSearchParams({ keyword: keyword, page: 1 });
+        const deadline = Date.now() + 60000;
+        let delay = 500;
+        
+        function poll() {
+            fetch(`/analysis/${analysisId}?${params}`)
+                .then(response => response.json())
+                .then(data => {
+                    // 그 사이 새로 검색했으면 이전 분석 결과는 무시
+                    if (currentAnalysisId !== analysisId) {
+                        return;
+                    }
+                    if (data.status === 'pending') {
+                        if (Date.now() < deadline) {
+                            setTimeout(poll, delay);
+                            delay = Math.min(delay * 1.5, 3000);
+                        } else {
+                            aiAnalysis.textContent = 'AI 분석 시간이 초과되었습니다. 잠시 후 다시 시도해주세요.';
+                        }
+                        return;
+                    }
+                    aiAnalysis.textContent = data.ai_analysis || data.error || '분석 정보를 불러오지 못했습니다.';
+                })
+                .catch(() => {
+                    if (currentAnalysisId === analysisId) {
+                        aiAnalysis.textContent = '분석 정보를 불러오지 못했습니다.';
+                    }
+                });
+        }
+        
+        setTimeout(poll, delay);
+    }
+
     // 주소에서 우편번호 제거 함수
     function cleanAddress(address) {
         // 우편번호 패턴 (숫자 5자리 또는 숫자-숫자 형태)
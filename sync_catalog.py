@@ -0,0 +1,25 @@
+"""문화공공데이터 API의 전체 서점 목록을 로컬 카탈로그 스냅샷으로 동기화합니다.
+
+사용법:
+    python sync_catalog.py [페이지당 건수]
+
+스냅샷 경로는 CATALOG_SNAPSHOT_PATH 환경 변수로 바꿀 수 있습니다
+(기본값: data/bookstores_snapshot.json).
+"""
+import os
+import sys
+
+# 동기화 중에는 검색 캐시 예열을 하지 않습니다.
+os.environ.setdefault("WARMUP_ENABLED", "false")
+
+from main import api
+
+if __name__ == "__main__":
+    page_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    result = api.sync_catalog(page_size=page_size)
+    
+    if "error" in result:
+        print(f"동기화 실패: {result['error']}")
+        sys.exit(1)
+    
+    print(f"동기화 완료: {result['total_count']}개 서점 → {api.catalog_path}")